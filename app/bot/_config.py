@@ -0,0 +1,20 @@
+"""
+Конфигурация бота.
+
+Загружает настройки из core.config один раз при старте, чтобы точка
+входа и обработчики использовали одни и те же значения.
+"""
+
+from core.config import (
+    get_admin_id,
+    get_api_host,
+    get_api_port,
+    get_bot_token,
+    get_log_level,
+)
+
+BOT_TOKEN = get_bot_token()
+ADMIN_ID = get_admin_id()
+ADMIN_IDS: frozenset[int] = frozenset([ADMIN_ID]) if ADMIN_ID else frozenset()
+API_BASE = f"http://{get_api_host()}:{get_api_port()}"
+LOG_LEVEL = get_log_level()
@@ -2,9 +2,16 @@ import asyncio
 import os
 import sys
 import logging
-import ssl
 
-ssl._create_default_https_context = ssl._create_unverified_context
+try:
+    import uvloop
+
+    # Цикл событий на libuv быстрее стандартного selector-цикла
+    loop_factory = uvloop.new_event_loop
+except ImportError:
+    # uvloop недоступен (например, на Windows) - используем стандартный цикл
+    loop_factory = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -15,16 +22,12 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from core.config import get_bot_token, get_admin_id, get_log_level
+    from bot._config import BOT_TOKEN, ADMIN_IDS, LOG_LEVEL
 
-    BOT_TOKEN = get_bot_token()
-    ADMIN_ID = get_admin_id()
-    ADMIN_IDS = [ADMIN_ID] if ADMIN_ID else []
-
-    log_level = getattr(logging, get_log_level().upper(), logging.INFO)
+    log_level = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
     logging.getLogger().setLevel(log_level)
 
-    logger.info(f"Конфиг загружен. Админы: {ADMIN_IDS}")
+    logger.info(f"Конфиг загружен. Админы: {sorted(ADMIN_IDS)}")
 
 except ImportError as e:
     logger.error(f"Ошибка импорта конфига: {e}")
@@ -35,15 +38,27 @@ except ValueError as e:
 
 
 async def main():
+    import orjson
     from aiogram import Bot, Dispatcher
-    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.client.session.aiohttp import AiohttpSession
     from bot.handlers import router
+    from bot import services
 
-    bot = Bot(token=BOT_TOKEN)
+    # orjson вместо stdlib json для запросов и ответов Telegram API
+    session = AiohttpSession(
+        json_loads=orjson.loads,
+        json_dumps=lambda obj: orjson.dumps(obj).decode(),
+    )
+    bot = Bot(token=BOT_TOKEN, session=session)
 
-    dp = Dispatcher(storage=MemoryStorage())
+    # FSM в обработчиках не используется, хранилище по умолчанию достаточно
+    dp = Dispatcher()
     dp.include_router(router)
 
+    # Общая HTTP-сессия для запросов к API анализа живёт вместе с поллингом
+    dp.startup.register(services.init_session)
+    dp.shutdown.register(services.close_session)
+
     try:
         # Удаляем вебхук и запускаем поллинг
         await bot.delete_webhook(drop_pending_updates=True)
@@ -53,7 +68,12 @@ async def main():
         me = await bot.get_me()
         logger.info(f"Бот авторизован как: @{me.username} (ID: {me.id})")
 
-        await dp.start_polling(bot)
+        # Подписываемся только на используемые типы обновлений
+        await dp.start_polling(
+            bot,
+            allowed_updates=dp.resolve_used_update_types(),
+            polling_timeout=30,
+        )
 
     except Exception as e:
         logger.exception(f"Критическая ошибка при работе бота: {e}")
@@ -69,7 +89,8 @@ async def main():
 if __name__ == "__main__":
     try:
         # Запускаем асинхронную главную функцию
-        asyncio.run(main())
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
@@ -0,0 +1,41 @@
+"""Форматирование статистики пользователя для ответов бота."""
+
+from functools import lru_cache
+
+from bot.services import APIStats
+from ._texts import stats_template
+
+
+def format_stats(stats: APIStats) -> str:
+    """Возвращает HTML-текст статистики пользователя."""
+    return _format_counts(
+        stats.total_requests, stats.positive, stats.negative, stats.neutral
+    )
+
+
+@lru_cache(maxsize=4)
+def _format_counts(total: int, positive: int, negative: int, neutral: int) -> str:
+    """Считает производные значения и форматирует шаблон статистики.
+
+    Счётчики меняются только с новыми запросами, поэтому повторные
+    просмотры статистики берут готовый текст из кэша.
+    """
+    successful = positive + negative + neutral
+    errors = total - successful if total >= successful else 0
+
+    # Избегаем деления на ноль
+    total_nonzero = total if total > 0 else 1
+
+    return stats_template.format_map(
+        {
+            "total": total,
+            "successful": successful,
+            "errors": errors,
+            "positive": positive,
+            "positive_percent": positive / total_nonzero,
+            "negative": negative,
+            "negative_percent": negative / total_nonzero,
+            "neutral": neutral,
+            "neutral_percent": neutral / total_nonzero,
+        }
+    )
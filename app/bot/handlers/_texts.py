@@ -0,0 +1,58 @@
+"""Общие тексты сообщений бота."""
+
+import sys
+from typing import Final
+
+# Справка собирается компилятором в одну строку-константу и разделяется
+# всеми обработчиками (/start, /help и кнопка «Помощь»)
+help_text: Final[str] = sys.intern(
+    "<b>📋 Инструкция:</b>\n\n"
+    "1. Отправь мне текст от 3 до 1000 символов\n"
+    "2. Я проанализирую его тональность\n"
+    "3. Покажу результат с точностью по моим метрикам!\n\n"
+    "<b>Используйте кнопки</b> для быстрого доступа.\n\n"
+    "<i>Примеры текста:</i>\n"
+    "• <code>Сегодня отличная погода!</code>\n"
+    "• <code>Я себя чувствую плохо весь день.</code>\n"
+    "• <code>В принципе всё могло быть и лучше</code>\n\n"
+    "<b>🚨 Помощь по командам:</b>\n\n"
+    "<b>Основные команды:</b>\n"
+    "• /start - начать работу с ботом\n"
+    "• /help - показать эту справку\n"
+    "• /stats - статистика тональности запросов\n"
+    "• /history - последние 10 запросов\n"
+    "• /about - автор \n"
+    "<b>Анализ текста:</b>\n"
+    "Пришли мне текст, отрывок из книги, отзыв или личное сообщение и я определю его тональность:\n"
+    "☀️ Позитивная\n"
+    "⛈️ Негативная\n"
+    "☁️ Нейтральная\n\n"
+    "Ответ с уровенем точности от 30-65% может показаться неправильным, бот отличает ироничные или противоречащие выражения и высчитывает с их учетом\n\n"
+    "‼️В данный момент ваша история и статистика могут в любой момент исчезнуть и потом снова появится, прошу не беспокоится \n\n"
+    "<b>P.s:</b> Разработчик очень старается, чтобы решить эту проблему(добавить потом бд) и скоро будут кнопочки верно или неверно :) ⚡️\n"
+)
+
+# Эмодзи тональностей в истории запросов
+history_emojis: Final[dict[str, str]] = {
+    "positive": "☀️",
+    "negative": "⛈️",
+    "neutral": "☁️",
+}
+
+# Шаблон статистики пользователя для /stats и кнопки «Статистика»
+stats_template: Final[str] = (
+    """
+📊 <b>Ваша статистика использования:</b>
+
+• Всего запросов: {total}
+• Успешных: {successful}
+• Ошибок: {errors}
+
+<b>Тональности ваших запросов:</b>
+☀️ Позитивных: {positive} ({positive_percent:.1%})
+⛈️ Негативных: {negative} ({negative_percent:.1%})
+☁️ Нейтральных: {neutral} ({neutral_percent:.1%})
+
+<i>Данные обновляются в реальном времени.</i>
+"""
+)
@@ -1,7 +1,11 @@
+import asyncio
+
 from aiogram import Router, F, types
 from bot.services import fetch_user_stats, get_user_history
 import logging
-from .start import help_text
+import time
+from ._stats_fmt import format_stats
+from ._texts import help_text, history_emojis
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -18,39 +22,7 @@ async def show_stats(callback: types.CallbackQuery) -> None:
     try:
         stats = await fetch_user_stats(user_id)
 
-        # Форматирование статистики
-        stats_template = """
-📊 <b>Ваша статистика использования:</b>
-
-• Всего запросов: {total}
-• Успешных: {successful}
-• Ошибок: {errors}
-
-<b>Тональности ваших запросов:</b>
-☀️ Позитивных: {positive} ({positive_percent:.1%})
-⛈️ Негативных: {negative} ({negative_percent:.1%})
-☁️ Нейтральных: {neutral} ({neutral_percent:.1%})
-
-<i>Данные обновляются в реальном времени.</i>
-"""
-        total = stats.total_requests
-        successful = stats.positive + stats.negative + stats.neutral
-        errors = total - successful if total >= successful else 0
-
-        # Избегаем деления на ноль
-        total_nonzero = total if total > 0 else 1
-
-        response_text = stats_template.format(
-            total=total,
-            successful=successful,
-            errors=errors,
-            positive=stats.positive,
-            positive_percent=stats.positive / total_nonzero if total_nonzero > 0 else 0,
-            negative=stats.negative,
-            negative_percent=stats.negative / total_nonzero if total_nonzero > 0 else 0,
-            neutral=stats.neutral,
-            neutral_percent=stats.neutral / total_nonzero if total_nonzero > 0 else 0,
-        )
+        response_text = format_stats(stats)
 
         await callback.message.answer(response_text, parse_mode="HTML")
 
@@ -67,24 +39,28 @@ async def show_stats(callback: types.CallbackQuery) -> None:
 async def show_help(callback: types.CallbackQuery) -> None:
     """Показать справку."""
 
-    await callback.message.answer(help_text, parse_mode="HTML")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer(help_text, parse_mode="HTML"),
+        callback.answer(),
+    )
 
 
 @router.callback_query(F.data == "more_analysis")
 async def more_analysis(callback: types.CallbackQuery) -> None:
     """Запрос нового анализа."""
 
-    await callback.message.answer(
-        "📝 <b>Отправьте следующий текст для анализа</b>\n\n"
-        "<i>Можно анализировать:</i>\n"
-        "• Отрывки из книг\n"
-        "• Отзывы \n"
-        "• Новостные заголовки\n"
-        "• Личные сообщения",
-        parse_mode="HTML",
+    await asyncio.gather(
+        callback.message.answer(
+            "📝 <b>Отправьте следующий текст для анализа</b>\n\n"
+            "<i>Можно анализировать:</i>\n"
+            "• Отрывки из книг\n"
+            "• Отзывы \n"
+            "• Новостные заголовки\n"
+            "• Личные сообщения",
+            parse_mode="HTML",
+        ),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data == "history")
@@ -108,34 +84,29 @@ async def show_history(callback: types.CallbackQuery) -> None:
             return
 
         # Форматируем историю
-        history_text = "📋 <b>История ваших запросов:</b>\n\n"
+        parts = ["📋 <b>История ваших запросов:</b>\n\n"]
 
         # Отображаем последние 10 запросов
-        for i, record in enumerate(reversed(history[-10:]), 1):
+        for i, record in enumerate(history[-1:-11:-1], 1):
             result = record["result"]
-            timestamp = record["timestamp"][:19].replace("T", " ")
+            text = result["text"]
+            sentiment = result["sentiment"]
+            confidence = result["confidence"]
+            timestamp = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(record["timestamp"])
+            )
 
             # Определяем эмодзи для тональности
-            sentiment_emojis = {
-                "positive": "☀️",
-                "negative": "⛈️",
-                "neutral": "☁️",
-            }
-            emoji = sentiment_emojis.get(result["sentiment"], "⚪")
+            emoji = history_emojis.get(sentiment, "⚪")
 
             # Сокращаем текст для отображения
-            display_text = (
-                result["text"][:50] + "..."
-                if len(result["text"]) > 50
-                else result["text"]
-            )
+            display_text = text[:50] + "..." if len(text) > 50 else text
 
-            history_text += f"{i}. {emoji} {display_text}\n"
-            history_text += (
-                f"   Уверенность: {result['confidence']:.1%} | {timestamp}\n\n"
-            )
+            parts.append(f"{i}. {emoji} {display_text}\n")
+            parts.append(f"   Уверенность: {confidence:.1%} | {timestamp}\n\n")
 
-        history_text += "<i>Показаны последние 10 запросов</i>"
+        parts.append("<i>Показаны последние 10 запросов</i>")
+        history_text = "".join(parts)
 
         await callback.message.answer(history_text, parse_mode="HTML")
 
@@ -157,16 +128,21 @@ async def show_settings(callback: types.CallbackQuery) -> None:
 async def confirm_analysis(callback: types.CallbackQuery) -> None:
     """Подтверждение анализа."""
 
-    await callback.message.answer("Отправьте текст для анализа.", parse_mode="HTML")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer("Отправьте текст для анализа.", parse_mode="HTML"),
+        callback.answer(),
+    )
 
 
 @router.callback_query(F.data == "no")
 async def cancel_analysis(callback: types.CallbackQuery) -> None:
     """Отмена анализа."""
 
-    await callback.message.answer(
-        "❌ <b>Анализ отменен.</b>\n" "Вы можете начать новый анализ в любое время.",
-        parse_mode="HTML",
+    await asyncio.gather(
+        callback.message.answer(
+            "❌ <b>Анализ отменен.</b>\n"
+            "Вы можете начать новый анализ в любое время.",
+            parse_mode="HTML",
+        ),
+        callback.answer(),
     )
-    await callback.answer()
@@ -1,61 +1,22 @@
-from venv import logger
 from aiogram import Router, types
 from aiogram.filters import Command
+from bot._config import ADMIN_IDS
 from bot.keyboards import get_main_keyboard
-import sys
-import os
-
-sys.path.append(
-    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-)
-
-try:
-    from core.config import get_admin_id, get_api_host, get_api_port
-
-    ADMIN_ID = get_admin_id()
-    ADMIN_IDS = [ADMIN_ID] if ADMIN_ID else []
-    API_HOST = get_api_host()
-    API_PORT = get_api_port()
-    API_BASE = f"http://{API_HOST}:{API_PORT}"
-except ImportError:
-    ADMIN_IDS = []
-    API_BASE = "http://127.0.0.1:8000"
+from bot.services import fetch_user_stats, get_user_history
+from ._stats_fmt import format_stats
+from ._texts import help_text, history_emojis
+import logging
+import time
 
 router = Router()
-
-help_text = (
-    "<b>📋 Инструкция:</b>\n\n"
-    "1. Отправь мне текст от 3 до 1000 символов\n"
-    "2. Я проанализирую его тональность\n"
-    "3. Покажу результат с точностью по моим метрикам!\n\n"
-    "<b>Используйте кнопки</b> для быстрого доступа.\n\n"
-    "<i>Примеры текста:</i>\n"
-    "• <code>Сегодня отличная погода!</code>\n"
-    "• <code>Я себя чувствую плохо весь день.</code>\n"
-    "• <code>В принципе всё могло быть и лучше</code>\n\n"
-    "<b>🚨 Помощь по командам:</b>\n\n"
-    "<b>Основные команды:</b>\n"
-    "• /start - начать работу с ботом\n"
-    "• /help - показать эту справку\n"
-    "• /stats - статистика тональности запросов\n"
-    "• /history - последние 10 запросов\n"
-    "• /about - автор \n"
-    "<b>Анализ текста:</b>\n"
-    "Пришли мне текст, отрывок из книги, отзыв или личное сообщение и я определю его тональность:\n"
-    "☀️ Позитивная\n"
-    "⛈️ Негативная\n"
-    "☁️ Нейтральная\n\n"
-    "Ответ с уровенем точности от 30-65% может показаться неправильным, бот отличает ироничные или противоречащие выражения и высчитывает с их учетом\n\n"
-    "‼️В данный момент ваша история и статистика могут в любой момент исчезнуть и потом снова появится, прошу не беспокоится \n\n"
-    "<b>P.s:</b> Разработчик очень старается, чтобы решить эту проблему(добавить потом бд) и скоро будут кнопочки верно или неверно :) ⚡️\n"
-)
+logger = logging.getLogger(__name__)
 
 
 @router.message(Command("start"))
 async def cmd_start(message: types.Message) -> None:
 
     # Проверяем админа
-    is_admin = message.from_user.id in ADMIN_IDS if ADMIN_IDS else False
+    is_admin = message.from_user.id in ADMIN_IDS
 
     greeting = f"Добро пожаловать, {message.from_user.first_name or 'друг'}! Я бот для анализа тональности текста."
 
@@ -75,8 +36,6 @@ async def cmd_help(message: types.Message) -> None:
 @router.message(Command("history"))
 async def cmd_history(message: types.Message) -> None:
     """Команда для получения истории запросов пользователя."""
-    from bot.services import get_user_history
-
     user_id = message.from_user.id
 
     try:
@@ -93,34 +52,29 @@ async def cmd_history(message: types.Message) -> None:
             return
 
         # Форматируем историю
-        history_text = "📋 <b>История ваших запросов:</b>\n\n"
+        parts = ["📋 <b>История ваших запросов:</b>\n\n"]
 
         # Отображаем последние 10 запросов
-        for i, record in enumerate(reversed(history[-10:]), 1):
+        for i, record in enumerate(history[-1:-11:-1], 1):
             result = record["result"]
-            timestamp = record["timestamp"][:19].replace("T", " ")
+            text = result["text"]
+            sentiment = result["sentiment"]
+            confidence = result["confidence"]
+            timestamp = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(record["timestamp"])
+            )
 
             # Определяем эмодзи для тональности
-            sentiment_emojis = {
-                "positive": "☀️",
-                "negative": "⛈️",
-                "neutral": "☁️",
-            }
-            emoji = sentiment_emojis.get(result["sentiment"], "⚪")
+            emoji = history_emojis.get(sentiment, "⚪")
 
             # Сокращаем текст для отображения
-            display_text = (
-                result["text"][:50] + "..."
-                if len(result["text"]) > 50
-                else result["text"]
-            )
+            display_text = text[:50] + "..." if len(text) > 50 else text
 
-            history_text += f"{i}. {emoji} {display_text}\n"
-            history_text += (
-                f"   Уверенность: {result['confidence']:.1%} | {timestamp}\n\n"
-            )
+            parts.append(f"{i}. {emoji} {display_text}\n")
+            parts.append(f"   Уверенность: {confidence:.1%} | {timestamp}\n\n")
 
-        history_text += "<i>Показаны последние 10 запросов</i>"
+        parts.append("<i>Показаны последние 10 запросов</i>")
+        history_text = "".join(parts)
 
         await message.answer(history_text, parse_mode="HTML")
 
@@ -135,53 +89,16 @@ async def cmd_history(message: types.Message) -> None:
 @router.message(Command("stats"))
 async def cmd_stats(message: types.Message) -> None:
     """Команда для получения статистики использования."""
-    from bot.services import fetch_user_stats
-
     user_id = message.from_user.id
 
     try:
         stats = await fetch_user_stats(user_id)
 
-        # Форматирование статистики
-        stats_template = """
-📊 <b>Ваша статистика использования:</b>
-
-• Всего запросов: {total}
-• Успешных: {successful}
-• Ошибок: {errors}
-
-<b>Тональности ваших запросов:</b>
-☀️ Позитивных: {positive} ({positive_percent:.1%})
-⛈️ Негативных: {negative} ({negative_percent:.1%})
-☁️ Нейтральных: {neutral} ({neutral_percent:.1%})
-
-<i>Данные обновляются в реальном времени.</i>
-"""
-        total = stats.total_requests
-        successful = stats.positive + stats.negative + stats.neutral
-        errors = total - successful if total >= successful else 0
-
-        # Избегаем деления на ноль
-        total_nonzero = total if total > 0 else 1
-
-        response_text = stats_template.format(
-            total=total,
-            successful=successful,
-            errors=errors,
-            positive=stats.positive,
-            positive_percent=stats.positive / total_nonzero if total_nonzero > 0 else 0,
-            negative=stats.negative,
-            negative_percent=stats.negative / total_nonzero if total_nonzero > 0 else 0,
-            neutral=stats.neutral,
-            neutral_percent=stats.neutral / total_nonzero if total_nonzero > 0 else 0,
-        )
+        response_text = format_stats(stats)
 
         await message.answer(response_text, parse_mode="HTML")
 
     except Exception as e:
-        from logging import getLogger
-
-        logger = getLogger(__name__)
         logger.error(f"Ошибка при получении статистики: {e}")
         await message.answer(
             " <b>Не удалось загрузить статистику</b>\n"
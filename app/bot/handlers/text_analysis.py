@@ -1,3 +1,6 @@
+import asyncio
+import html
+
 from aiogram import Router, F, types
 from bot.services import analyze_text
 from bot.keyboards import get_sentiment_keyboard
@@ -43,13 +46,16 @@ async def handle_text(message: types.Message) -> None:
         await message.answer("📏 Текст слишком длинный. Максимум 1000 символов.")
         return
 
+    status_task = None
+    status_msg = None
     try:
-        status_msg = await message.answer(
-            "🔍 Анализирую текст..."
-        )  # Статусное сообщение, потом удаляем
-
-        # Анализ текста
-        result = await analyze_text(text, message.from_user.id)
+        # Статусное сообщение (потом удаляем) отправляется параллельно с анализом.
+        # message.answer возвращает TelegramMethod, а не корутину, поэтому
+        # ensure_future, а не create_task
+        status_task = asyncio.ensure_future(message.answer("🔍 Анализирую текст..."))
+        status_msg, result = await asyncio.gather(
+            status_task, analyze_text(text, message.from_user.id)
+        )
 
         # Проверяем, что результат не None
         if result is None:
@@ -70,9 +76,12 @@ async def handle_text(message: types.Message) -> None:
             result.sentiment, f"⚪ {result.sentiment.title()}"
         )
 
+        # Превью текста; пользовательский ввод экранируем для parse_mode=HTML
+        preview = text if len(text) <= 100 else text[:100] + "..."
+
         response = (
             f"🎭 <b>Результат анализа:</b>\n\n"
-            f"💬 <b>Ваш текст:</b>\n<code>{text[:100]}{'...' if len(text) > 200 else ''}</code>\n\n"
+            f"💬 <b>Ваш текст:</b>\n<code>{html.escape(preview)}</code>\n\n"
             f"📊 <b>Тональность:</b> {sentiment_display}\n"
             f"🎯 <b>Точность:</b> {result.confidence:.1%}\n\n"
         )
@@ -87,10 +96,11 @@ async def handle_text(message: types.Message) -> None:
         logger.error(f"Ошибка при анализе текста: {e}", exc_info=True)
 
         # статусное сообщение удаляется при ошибке
-        if "status_msg" in locals():
-            try:
-                await status_msg.delete()
-            except:
-                pass
+        try:
+            if status_msg is None and status_task is not None:
+                status_msg = await status_task
+            await status_msg.delete()
+        except Exception:
+            pass
 
         await send_error_message(message)
@@ -5,10 +5,10 @@ from aiogram.types import (
     KeyboardButton,
 )
 
-
-def get_main_keyboard() -> InlineKeyboardMarkup:
-
-    buttons = [
+# Клавиатуры не зависят от пользователя, поэтому собираются один раз
+# при импорте модуля и переиспользуются при каждой отправке.
+_MAIN_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
             InlineKeyboardButton(text="🚨 Помощь", callback_data="help"),
@@ -17,14 +17,10 @@ def get_main_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="🔍 Анализ", callback_data="more_analysis"),
         ],
     ]
+)
 
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-def get_sentiment_keyboard() -> InlineKeyboardMarkup:
-    """Клавиатура после анализа текста."""
-
-    buttons = [
+_SENTIMENT_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             InlineKeyboardButton(text="🔍 Анализ", callback_data="more_analysis"),
             InlineKeyboardButton(text="📋 История", callback_data="history"),
@@ -33,35 +29,47 @@ def get_sentiment_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
         ],
     ]
+)
 
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-def get_yes_no_keyboard() -> InlineKeyboardMarkup:
-    """Простая клавиатура Да/Нет."""
-
-    buttons = [
+_YES_NO_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             InlineKeyboardButton(text="Да", callback_data="yes"),
             InlineKeyboardButton(text="Нет", callback_data="no"),
         ]
     ]
+)
 
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-def get_reply_keyboard() -> ReplyKeyboardMarkup:
-    """Reply-клавиатура для быстрого доступа."""
-
-    buttons = [
+_REPLY_KB = ReplyKeyboardMarkup(
+    keyboard=[
         [KeyboardButton(text="📊 Статистика"), KeyboardButton(text="🚨 Помощь")],
         [
             KeyboardButton(text="🔍 Анализ"),
         ],
-    ]
+    ],
+    resize_keyboard=True,
+    one_time_keyboard=False,
+)
+
+
+def get_main_keyboard() -> InlineKeyboardMarkup:
+
+    return _MAIN_KB
+
+
+def get_sentiment_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура после анализа текста."""
+
+    return _SENTIMENT_KB
+
+
+def get_yes_no_keyboard() -> InlineKeyboardMarkup:
+    """Простая клавиатура Да/Нет."""
+
+    return _YES_NO_KB
+
+
+def get_reply_keyboard() -> ReplyKeyboardMarkup:
+    """Reply-клавиатура для быстрого доступа."""
 
-    return ReplyKeyboardMarkup(
-        keyboard=buttons,
-        resize_keyboard=True,
-        one_time_keyboard=False,
-    )
+    return _REPLY_KB
@@ -7,30 +7,46 @@
 """
 
 import aiohttp
-import os
+import asyncio
+import hashlib
+import sys
+import time
 import logging
+import orjson
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Dict, List
-import json
+from typing import Deque, Dict, List
+
+from bot._config import API_BASE
 
 logger = logging.getLogger(__name__)
 
-# Конфигурация API
-API_HOST = os.getenv("API_HOST", "localhost")
-API_PORT = os.getenv("API_PORT", "8000")
-API_BASE = f"http://{API_HOST}:{API_PORT}"
+# Таймауты запросов к API создаются один раз и переиспользуются
+_POST_TIMEOUT = aiohttp.ClientTimeout(total=10)
+_GET_TIMEOUT = aiohttp.ClientTimeout(total=5)
 
 # Кэш для результатов анализа
-result_cache: Dict[str, dict] = {}
+result_cache: "OrderedDict[bytes, SentimentResult]" = OrderedDict()
 cache_limit = 100  # Максимальное количество записей в кэше
 
+# Кэш неудачных запросов: ключ текста -> время истечения (time.monotonic)
+failure_cache: "OrderedDict[bytes, float]" = OrderedDict()
+failure_cache_limit = 256  # Максимальное количество записей
+failure_cache_ttl = 5.0  # Сколько секунд не повторять запрос после ошибки
+
 # История запросов пользователя
-user_histories: Dict[int, List[dict]] = {}
 history_limit = 50  # Максимальное количество записей в истории пользователя
+user_histories: Dict[int, Deque[dict]] = defaultdict(
+    lambda: deque(maxlen=history_limit)
+)
 
+# Общая HTTP-сессия для всех запросов к API (пул соединений и keep-alive)
+_session: aiohttp.ClientSession | None = None
+_session_lock = asyncio.Lock()
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class SentimentResult:
     """Результат анализа тональности.
 
@@ -44,7 +60,7 @@ class SentimentResult:
     timestamp: datetime
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class APIStats:
     """Статистика API.
 
@@ -59,111 +75,178 @@ class APIStats:
     uptime_seconds: float = 0.0
 
 
-def _add_to_cache(text: str, result: dict) -> None:
-    """Добавляет результат в кэш с ограничением по размеру."""
-    if len(result_cache) >= cache_limit:
-        # Удаляем самую старую запись
-        oldest_key = next(iter(result_cache))
-        del result_cache[oldest_key]
+async def get_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию, создавая её при первом обращении."""
+    global _session
+    if _session is not None and not _session.closed:
+        return _session
 
-    result_cache[text] = result
+    async with _session_lock:
+        # Сессию мог создать конкурентный вызов, пока мы ждали блокировку
+        if _session is None or _session.closed:
+            _session = aiohttp.ClientSession(
+                base_url=API_BASE,
+                connector=aiohttp.TCPConnector(
+                    limit=100, ttl_dns_cache=300, keepalive_timeout=75
+                ),
+                timeout=_POST_TIMEOUT,
+            )
+    return _session
 
 
-def _get_from_cache(text: str) -> dict | None:
-    """Получает результат из кэша."""
-    return result_cache.get(text)
+async def init_session() -> None:
+    """Создаёт общую HTTP-сессию при запуске бота."""
+    await get_session()
 
 
-def _add_to_history(user_id: int, result: dict) -> None:
-    """Добавляет результат в историю пользователя с ограничением по размеру."""
-    if user_id not in user_histories:
-        user_histories[user_id] = []
+async def close_session() -> None:
+    """Закрывает общую HTTP-сессию при остановке бота."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
-    user_histories[user_id].append(
-        {"timestamp": datetime.now().isoformat(), "result": result}
-    )
 
-    # Ограничиваем размер истории
-    if len(user_histories[user_id]) > history_limit:
-        user_histories[user_id].pop(0)
+if sys.version_info >= (3, 11):
+    # С Python 3.11 fromisoformat сам понимает суффикс "Z"
+    _parse_timestamp = datetime.fromisoformat
+else:
 
+    def _parse_timestamp(value: str) -> datetime:
+        """Разбирает ISO-метку времени API, включая суффикс "Z"."""
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
-def get_user_history(user_id: int) -> List[dict]:
-    """Получает историю запросов пользователя."""
-    return user_histories.get(user_id, [])
 
+def _cache_key(text: str) -> bytes:
+    """Возвращает компактный ключ кэша фиксированного размера для текста."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
 
-async def analyze_text(text: str, user_id: int | None = None) -> SentimentResult | None:
-    """Анализирует текст через API с кэшированием и сохранением истории."""
-    # Проверяем кэш
-    cached_result = _get_from_cache(text)
-    if cached_result:
-        logger.info(f"Результат найден в кэше для user_id={user_id}")
-        return SentimentResult(
-            text=cached_result["text"],
-            sentiment=cached_result["sentiment"],
-            confidence=float(cached_result["confidence"]),
-            timestamp=datetime.fromisoformat(
-                cached_result["timestamp"].replace("Z", "+00:00")
-            ),
-        )
 
-    logger.info(f"Анализ для user_id={user_id}: {text[:50]}...")
+def _add_to_cache(text: str, result: SentimentResult) -> None:
+    """Добавляет результат в LRU-кэш с ограничением по размеру."""
+    key = _cache_key(text)
+    result_cache[key] = result
+    result_cache.move_to_end(key)
+
+    if len(result_cache) > cache_limit:
+        # Удаляем давно не использованную запись
+        result_cache.popitem(last=False)
+
+
+def _get_from_cache(text: str) -> SentimentResult | None:
+    """Получает результат из кэша и отмечает его как недавно использованный."""
+    key = _cache_key(text)
+    result = result_cache.get(key)
+    if result is not None:
+        result_cache.move_to_end(key)
+    return result
+
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                f"{API_BASE}/predict",
-                json={"text": text, "userId": user_id},
-                timeout=10,
-            ) as response:
+def _mark_failed(text: str) -> None:
+    """Запоминает неудачный анализ текста на failure_cache_ttl секунд."""
+    key = _cache_key(text)
+    failure_cache[key] = time.monotonic() + failure_cache_ttl
+    failure_cache.move_to_end(key)
 
-                if response.status == 200:
-                    data = await response.json()
+    if len(failure_cache) > failure_cache_limit:
+        failure_cache.popitem(last=False)
 
-                    # Сохраняем в кэш
-                    _add_to_cache(text, data)
 
-                    # Сохраняем в историю пользователя
-                    if user_id:
-                        _add_to_history(user_id, data)
+def _recently_failed(text: str) -> bool:
+    """Проверяет, завершался ли анализ текста ошибкой в последние секунды."""
+    key = _cache_key(text)
+    expires_at = failure_cache.get(key)
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        del failure_cache[key]
+        return False
+    return True
 
-                    return SentimentResult(
-                        text=data["text"],
-                        sentiment=data["sentiment"],
-                        confidence=float(data["confidence"]),
-                        timestamp=datetime.fromisoformat(
-                            data["timestamp"].replace("Z", "+00:00")
-                        ),
-                    )
-                else:
-                    logger.error(f"Ошибка API: {response.status}")
-                    return None
 
-        except Exception as e:
-            logger.error(f"Ошибка запроса: {e}")
-            return None
+def _add_to_history(user_id: int, result: dict) -> None:
+    """Добавляет результат в историю пользователя с ограничением по размеру.
+
+    Старые записи вытесняются автоматически благодаря deque(maxlen=...).
+    """
+    user_histories[user_id].append({"timestamp": time.time(), "result": result})
+
+
+def get_user_history(user_id: int) -> List[dict]:
+    """Получает историю запросов пользователя."""
+    return list(user_histories.get(user_id, ()))
+
+
+async def analyze_text(text: str, user_id: int | None = None) -> SentimentResult | None:
+    """Анализирует текст через API с кэшированием и сохранением истории."""
+    # Проверяем кэш
+    cached_result = _get_from_cache(text)
+    if cached_result is not None:
+        logger.info("Результат найден в кэше для user_id=%s", user_id)
+        return cached_result
+
+    # Не повторяем запрос к API, если этот текст только что не удалось проанализировать
+    if _recently_failed(text):
+        logger.info(
+            "Недавняя ошибка анализа, пропускаем запрос для user_id=%s", user_id
+        )
+        return None
+
+    logger.info("Анализ для user_id=%s: %s...", user_id, text[:50])
+
+    session = await get_session()
+    try:
+        async with session.post(
+            "/predict",
+            json={"text": text, "userId": user_id},
+            timeout=_POST_TIMEOUT,
+        ) as response:
+
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                result = SentimentResult(
+                    text=data["text"],
+                    sentiment=data["sentiment"],
+                    confidence=float(data["confidence"]),
+                    timestamp=_parse_timestamp(data["timestamp"]),
+                )
+
+                # Сохраняем в кэш готовый результат
+                _add_to_cache(text, result)
+
+                # Сохраняем в историю пользователя
+                if user_id:
+                    _add_to_history(user_id, data)
+
+                return result
+            else:
+                logger.error("Ошибка API: %s", response.status)
+                _mark_failed(text)
+                return None
+
+    except Exception as e:
+        logger.error("Ошибка запроса: %s", e)
+        _mark_failed(text)
+        return None
 
 
 async def fetch_user_stats(user_id: int) -> APIStats:
     """Получает статистику с API для конкретного пользователя."""
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(
-                f"{API_BASE}/stats/{user_id}", timeout=5
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return APIStats(
-                        total_requests=data.get("total_requests", 0),
-                        positive=data.get("positive", 0),
-                        negative=data.get("negative", 0),
-                        neutral=data.get("neutral", 0),
-                        uptime_seconds=data.get("uptime_seconds", 0.0),
-                    )
-                else:
-                    logger.error(f"Ошибка получения статистики: {response.status}")
-                    return APIStats(0, 0, 0, 0)
-        except Exception as e:
-            logger.error(f"Ошибка запроса статистики: {e}")
-            return APIStats(0, 0, 0, 0)
+    session = await get_session()
+    try:
+        async with session.get(f"/stats/{user_id}", timeout=_GET_TIMEOUT) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                return APIStats(
+                    total_requests=data.get("total_requests", 0),
+                    positive=data.get("positive", 0),
+                    negative=data.get("negative", 0),
+                    neutral=data.get("neutral", 0),
+                    uptime_seconds=data.get("uptime_seconds", 0.0),
+                )
+            else:
+                logger.error("Ошибка получения статистики: %s", response.status)
+                return APIStats(0, 0, 0, 0)
+    except Exception as e:
+        logger.error("Ошибка запроса статистики: %s", e)
+        return APIStats(0, 0, 0, 0)
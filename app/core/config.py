@@ -1,8 +1,11 @@
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator
+
+logger = logging.getLogger(__name__)
 
 # Ищем .env в корне проекта
 project_root = Path(__file__).parent.parent
@@ -14,6 +17,21 @@ else:
     load_dotenv()
 
 
+def _parse_num_threads(value) -> int | None:
+    """Разбирает ML_NUM_THREADS; некорректное значение заменяется на None."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logger.warning(
+            "Некорректное значение ML_NUM_THREADS=%r, число потоков "
+            "вычисляется по ядрам",
+            value,
+        )
+        return None
+
+
 class Settings(BaseSettings):
     """Конфигурация приложения с валидацией."""
 
@@ -28,6 +46,23 @@ class Settings(BaseSettings):
         "cointegrated/rubert-tiny-sentiment-balanced", validation_alias="ML_MODEL_NAME"
     )
 
+    # Динамическая int8-квантизация модели на CPU (опционально: меняет оценки)
+    ml_quantize: bool = Field(False, validation_alias="ML_QUANTIZE")
+
+    # Компиляция PyTorch-модели через torch.compile
+    ml_torch_compile: bool = Field(False, validation_alias="ML_TORCH_COMPILE")
+
+    # Каталог с экспортированной ONNX-моделью (используется вместо PyTorch)
+    ml_onnx_path: str | None = Field(None, validation_alias="ML_ONNX_PATH")
+
+    # Число потоков инференса на процесс (по умолчанию вычисляется по ядрам)
+    ml_num_threads: int | None = Field(None, validation_alias="ML_NUM_THREADS")
+
+    @field_validator("ml_num_threads", mode="before")
+    @classmethod
+    def _validate_num_threads(cls, value):
+        return _parse_num_threads(value)
+
     # Настройки API
     api_host: str = Field("localhost", validation_alias="API_HOST")
     api_port: int = Field(8000, validation_alias="API_PORT")
@@ -61,6 +96,12 @@ except Exception as e:
             self.ml_model_name = os.getenv(
                 "ML_MODEL_NAME", "cointegrated/rubert-tiny-sentiment-balanced"
             )
+            self.ml_quantize = os.getenv("ML_QUANTIZE", "false").lower() == "true"
+            self.ml_torch_compile = (
+                os.getenv("ML_TORCH_COMPILE", "false").lower() == "true"
+            )
+            self.ml_onnx_path = os.getenv("ML_ONNX_PATH") or None
+            self.ml_num_threads = _parse_num_threads(os.getenv("ML_NUM_THREADS"))
             self.api_host = os.getenv("API_HOST", "localhost")
             self.api_port = int(os.getenv("API_PORT", "8000"))
             self.api_reload = os.getenv("API_RELOAD", "false").lower() == "true"
@@ -85,6 +126,26 @@ def get_ml_model() -> str:
     return settings.ml_model_name
 
 
+def get_ml_quantize() -> bool:
+    """Нужно ли квантизовать ML модель в int8"""
+    return settings.ml_quantize
+
+
+def get_ml_torch_compile() -> bool:
+    """Нужно ли компилировать модель через torch.compile"""
+    return settings.ml_torch_compile
+
+
+def get_ml_onnx_path() -> str | None:
+    """Получить путь к ONNX-модели, если она задана"""
+    return settings.ml_onnx_path
+
+
+def get_ml_num_threads() -> int | None:
+    """Получить число потоков инференса, если оно задано"""
+    return settings.ml_num_threads
+
+
 def get_api_host() -> str:
     """Получить хост API"""
     return settings.api_host
@@ -115,6 +176,10 @@ __all__ = [
     "get_bot_token",
     "get_admin_id",
     "get_ml_model",
+    "get_ml_quantize",
+    "get_ml_torch_compile",
+    "get_ml_onnx_path",
+    "get_ml_num_threads",
     "get_api_host",
     "get_api_port",
     "get_api_reload",
@@ -6,123 +6,225 @@ FastAPI сервис для анализа тональности текста.
 для отслеживания статистики и ограничения частоты запросов.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 import logging
-import json
+import mmap
 import os
-from typing import Dict, Any
+from typing import Dict
 from functools import wraps
+import inspect
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
-from fastapi import FastAPI, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+import aiofiles
+import orjson
+
+from fastapi import Depends, FastAPI, HTTPException, status, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field, ConfigDict
 
-from ml_service import get_analyzer
+from core.config import get_environment
+from ml_service import SentimentAnalyzer, get_analyzer
 
 logger = logging.getLogger(__name__)
 
 # Файл для сохранения статистики
 STATS_FILE = "stats.json"
+STATS_SAVE_INTERVAL = 300  # Период фонового сохранения статистики, секунды
+
+# Хранилище для rate limiting: user_id или IP -> (доступные токены, время пополнения)
+rate_buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+RATE_BUCKETS_LIMIT = 10_000  # Максимальное количество отслеживаемых клиентов
+
+
+# Закэшированное тело ответа /health и момент его устаревания (time.monotonic)
+_health_body = b""
+_health_expires_at = 0.0
 
-# Хранилище для rate limiting
-request_counts: Dict[str, int] = {}
-last_reset = time.time()
+# Индексы тональностей в UserStat.counts
+SENTIMENT_INDEX = {"positive": 0, "negative": 1, "neutral": 2}
+
+
+@dataclass(slots=True)
+class UserStat:
+    """Статистика запросов одного пользователя.
+
+    Счётчики тональностей хранятся в списке counts в порядке
+    positive, negative, neutral (см. SENTIMENT_INDEX).
+    """
+
+    total: int = 0
+    counts: list[int] = field(default_factory=lambda: [0, 0, 0])
+    start_time: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserStat":
+        """Создаёт статистику из словаря, сохранённого as_dict."""
+        user_stat = cls(
+            total=data.get("total", 0),
+            counts=[
+                data.get("positive", 0),
+                data.get("negative", 0),
+                data.get("neutral", 0),
+            ],
+        )
+        start_time = data.get("start_time")
+        if isinstance(start_time, str):
+            # Файлы старого формата хранят время в ISO-строке
+            start_time = datetime.fromisoformat(start_time).timestamp()
+        if start_time is not None:
+            user_stat.start_time = start_time
+        return user_stat
+
+    def as_dict(self) -> dict[str, object]:
+        """Конвертирует статистику в словарь для сохранения в файл."""
+        positive, negative, neutral = self.counts
+        return {
+            "total": self.total,
+            "positive": positive,
+            "negative": negative,
+            "neutral": neutral,
+            "start_time": self.start_time,
+        }
 
 
 # Хранилище для пользовательской статистики
-user_stats: Dict[int, Dict[str, Any]] = defaultdict(
-    lambda: {
-        "total": 0,
-        "positive": 0,
-        "negative": 0,
-        "neutral": 0,
-        "start_time": datetime.now().isoformat(),
-    }
-)
+user_stats: Dict[int, UserStat] = defaultdict(UserStat)
 
 
 # Загрузка статистики из файла
 def load_stats():
     """Загружает статистику из файла при запуске."""
-    global user_stats
     try:
-        if os.path.exists(STATS_FILE):
-            with open(STATS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-                # Загрузка пользовательской статистики
-                if "users" in data:
-                    for user_id, user_data in data["users"].items():
-                        user_stats[int(user_id)] = {
-                            "total": user_data.get("total", 0),
-                            "positive": user_data.get("positive", 0),
-                            "negative": user_data.get("negative", 0),
-                            "neutral": user_data.get("neutral", 0),
-                            "start_time": user_data.get(
-                                "start_time", datetime.now().isoformat()
-                            ),
-                        }
+        if os.path.exists(STATS_FILE) and os.path.getsize(STATS_FILE):
+            # Файл отображается в память и разбирается без промежуточной копии
+            with open(STATS_FILE, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mm, memoryview(mm) as view:
+                data = orjson.loads(view)
+
+            # Загрузка пользовательской статистики
+            for user_id, user_data in data.get("users", {}).items():
+                user_stats[int(user_id)] = UserStat.from_dict(user_data)
 
             logger.info("Статистика загружена из файла")
     except Exception as e:
-        logger.error(f"Ошибка загрузки статистики: {e}")
+        logger.error("Ошибка загрузки статистики: %s", e)
 
 
 # Сохранение статистики в файл
-def save_stats():
-    """Сохраняет статистику в файл при завершении работы."""
+async def save_stats():
+    """Сохраняет статистику в файл.
+
+    Данные пишутся во временный файл, который затем атомарно заменяет
+    основной, поэтому прерванная запись не портит stats.json.
+    """
     try:
         # Подготовка данных для сохранения (только пользовательская статистика)
-        data = {"users": {}}
-
-        # Добавляем пользовательскую статистику
-        for user_id, user_data in user_stats.items():
-            data["users"][str(user_id)] = {
-                "total": user_data["total"],
-                "positive": user_data["positive"],
-                "negative": user_data["negative"],
-                "neutral": user_data["neutral"],
-                "start_time": user_data["start_time"],
+        data = {
+            "users": {
+                str(user_id): stat.as_dict() for user_id, stat in user_stats.items()
             }
-
-        with open(STATS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        }
+
+        tmp_file = f"{STATS_FILE}.tmp"
+        async with aiofiles.open(tmp_file, "wb") as f:
+            # В разработке файл форматируется для чтения человеком
+            option = orjson.OPT_INDENT_2 if get_environment() == "development" else 0
+            await f.write(orjson.dumps(data, option=option))
+        os.replace(tmp_file, STATS_FILE)
         logger.info("Статистика сохранена в файл")
     except Exception as e:
-        logger.error(f"Ошибка сохранения статистики: {e}")
+        logger.error("Ошибка сохранения статистики: %s", e)
+
+
+async def save_stats_periodically(interval: int = STATS_SAVE_INTERVAL):
+    """Периодически сохраняет статистику, пока работает приложение.
+
+    Счётчики только растут, поэтому по сумме total видно, были ли новые
+    запросы; если нет, файл не перезаписывается.
+    """
+    saved_total = sum(stat.total for stat in user_stats.values())
+    while True:
+        await asyncio.sleep(interval)
+        current_total = sum(stat.total for stat in user_stats.values())
+        if current_total != saved_total:
+            await save_stats()
+            saved_total = current_total
 
 
 # Декоратор для rate limiting
 def rate_limit(max_requests: int = 100, window: int = 60):
-    """Декоратор для ограничения количества запросов."""
+    """Декоратор для ограничения количества запросов.
 
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            global last_reset
-            current_time = time.time()
+    Использует token bucket на каждого клиента: корзина вмещает
+    max_requests токенов и равномерно пополняется за window секунд, поэтому
+    на границе окна не возникает двойного всплеска запросов.
 
-            # Сброс счетчиков каждые window секунд
-            if current_time - last_reset > window:
-                request_counts.clear()
-                last_reset = current_time
+    Клиент определяется по user_id из тела запроса, если он передан, иначе
+    по IP. Все запросы бота приходят с одного IP, и без user_id пользователи
+    Telegram делили бы один общий лимит.
+    """
+    refill_rate = max_requests / window
 
-            # Получаем IP клиента
-            request = next((arg for arg in args if isinstance(arg, Request)), None)
-            if request:
-                client_ip = request.client.host
-                current_count = request_counts.get(client_ip, 0)
+    def decorator(func):
+        # Имя параметра с Request определяется один раз, а не на каждом запросе.
+        # FastAPI передаёт параметры эндпоинта именованными аргументами.
+        request_param = next(
+            (
+                name
+                for name, param in inspect.signature(func).parameters.items()
+                if param.annotation is Request
+            ),
+            None,
+        )
+        if request_param is None:
+            raise TypeError(f"{func.__name__} должен принимать параметр типа Request")
+
+        # Параметр с телом запроса, в котором может быть user_id
+        user_param = next(
+            (
+                name
+                for name, param in inspect.signature(func).parameters.items()
+                if isinstance(param.annotation, type)
+                and issubclass(param.annotation, BaseModel)
+                and "user_id" in param.annotation.model_fields
+            ),
+            None,
+        )
 
-                if current_count >= max_requests:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Ключ корзины: user_id из тела запроса или IP клиента
+            user_id = getattr(kwargs.get(user_param), "user_id", None)
+            request = kwargs.get(request_param)
+            if user_id is not None:
+                client_key = f"user:{user_id}"
+            elif request is not None and request.client:
+                client_key = request.client.host
+            else:
+                client_key = None
+
+            if client_key is not None:
+                now = time.monotonic()
+
+                # pop + вставка переносит ключ в конец, старые вытесняются первыми
+                tokens, last_refill = rate_buckets.pop(client_key, (max_requests, now))
+                tokens = min(max_requests, tokens + (now - last_refill) * refill_rate)
+
+                if tokens < 1:
+                    rate_buckets[client_key] = (tokens, now)
                     raise HTTPException(
                         status_code=429,
                         detail=f"Превышен лимит запросов. Максимум {max_requests} запросов в {window} секунд.",
                     )
 
-                request_counts[client_ip] = current_count + 1
+                rate_buckets[client_key] = (tokens - 1, now)
+                if len(rate_buckets) > RATE_BUCKETS_LIMIT:
+                    rate_buckets.popitem(last=False)
 
             return await func(*args, **kwargs)
 
@@ -147,6 +249,8 @@ class SentimentResponse(BaseModel):
     """Ответ с результатом анализа тональности.
 
     Модель данных для ответа с результатами анализа тональности текста.
+    Используется только для схемы OpenAPI: /predict сам возвращает
+    ORJSONResponse, минуя валидацию и jsonable_encoder.
     """
 
     text: str
@@ -172,34 +276,66 @@ async def lifespan(app: FastAPI):
 
     try:
         analyzer = get_analyzer()
-        logger.info(f"Готов к работе: {analyzer.model_name}")
+        analyzer.start_batching()
+        # Модель загружается заранее, чтобы первый запрос не ждал её
+        await asyncio.to_thread(analyzer.warmup)
+        logger.info("Готов к работе: %s", analyzer.model_name)
     except Exception as e:
-        logger.error(f"Ошибка инициализации ML: {e}")
+        logger.error("Ошибка инициализации ML: %s", e)
+
+    # Фоновое сохранение статистики
+    save_task = asyncio.create_task(save_stats_periodically())
 
     yield
 
+    # Анализатор мог быть заменён через set_analyzer, останавливаем текущий
+    await get_analyzer().stop_batching()
+    save_task.cancel()
+    try:
+        await save_task
+    except asyncio.CancelledError:
+        pass
+
     # Сохраняем статистику в файл
-    save_stats()
+    await save_stats()
     logger.info("Остановка API...")
 
 
+def get_current_analyzer() -> SentimentAnalyzer:
+    """Возвращает текущий анализатор.
+
+    Используется как зависимость эндпоинтов. Анализатор берётся из
+    ml_service на каждый запрос, поэтому замена модели через
+    set_analyzer сразу видна эндпоинтам.
+    """
+    return get_analyzer()
+
+
 # Создание приложения
-app = FastAPI(title="Sentiment Analysis API", version="2.0.0", lifespan=lifespan)
+app = FastAPI(
+    title="Sentiment Analysis API",
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 
 # Эндпоинты
 @app.get("/")
-async def root() -> dict:
+async def root(
+    analyzer: SentimentAnalyzer = Depends(get_current_analyzer),
+) -> dict:
     """Корневой эндпоинт с информацией о сервисе.
 
     Возвращает базовую информацию о сервисе, включая версию,
     используемую модель и доступные эндпоинты.
 
+    Args:
+        analyzer (SentimentAnalyzer): Анализатор тональности.
+
     Returns:
         dict: Информация о сервисе.
     """
-    analyzer = get_analyzer()
-
     return {
         "service": "Sentiment Analysis API",
         "version": "2.0.0",
@@ -212,9 +348,17 @@ async def root() -> dict:
     }
 
 
-@app.post("/predict", response_model=SentimentResponse)
+@app.post(
+    "/predict",
+    response_model=None,
+    responses={status.HTTP_200_OK: {"model": SentimentResponse}},
+)
 @rate_limit(max_requests=30, window=60)  # 30 запросов в минуту
-async def predict(request: SentimentRequest) -> SentimentResponse:
+async def predict(
+    request: SentimentRequest,
+    http_request: Request,
+    analyzer: SentimentAnalyzer = Depends(get_current_analyzer),
+) -> ORJSONResponse:
     """Анализирует тональность текста.
 
     Принимает текст для анализа тональности и возвращает результат
@@ -222,39 +366,42 @@ async def predict(request: SentimentRequest) -> SentimentResponse:
 
     Args:
         request (SentimentRequest): Запрос с текстом для анализа.
+        http_request (Request): HTTP-запрос; по IP считается лимит без user_id.
+        analyzer (SentimentAnalyzer): Анализатор тональности.
 
     Returns:
-        SentimentResponse: Результат анализа с оценкой точности.
+        ORJSONResponse: Результат анализа в формате SentimentResponse.
 
     Raises:
         HTTPException: При ошибке анализа текста.
     """
     try:
-        analyzer = get_analyzer()
-        result = analyzer.analyze(request.text)
+        # Запрос попадает в общий батч вместе с конкурентными запросами
+        result = await analyzer.analyze_async(request.text)
 
         # Обновляем пользовательскую статистику, если указан user_id
         if request.user_id is not None:
-            user_stats[request.user_id]["total"] += 1
-            match result["sentiment"]:
-                case "positive":
-                    user_stats[request.user_id]["positive"] += 1
-                case "negative":
-                    user_stats[request.user_id]["negative"] += 1
-                case "neutral":
-                    user_stats[request.user_id]["neutral"] += 1
-
-        logger.info(f"Анализ для user_id={request.user_id}: {result['sentiment']}")
-
-        return SentimentResponse(
-            text=result["text"],
-            sentiment=result["sentiment"],
-            confidence=result["confidence"],
-            timestamp=datetime.now(),
+            user_stat = user_stats[request.user_id]
+            user_stat.total += 1
+            sentiment_index = SENTIMENT_INDEX.get(result["sentiment"])
+            if sentiment_index is not None:
+                user_stat.counts[sentiment_index] += 1
+
+        logger.info("Анализ для user_id=%s: %s", request.user_id, result["sentiment"])
+
+        # Ответ собирается сразу: словарь, возвращённый из эндпоинта, FastAPI
+        # прогнал бы через jsonable_encoder до ORJSONResponse
+        return ORJSONResponse(
+            {
+                "text": result["text"],
+                "sentiment": result["sentiment"],
+                "confidence": result["confidence"],
+                "timestamp": datetime.now(),
+            }
         )
 
     except Exception as e:
-        logger.error(f"Ошибка анализа: {e}")
+        logger.error("Ошибка анализа: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Ошибка при анализе текста",
@@ -262,15 +409,26 @@ async def predict(request: SentimentRequest) -> SentimentResponse:
 
 
 @app.get("/health")
-async def health() -> dict:
+async def health() -> Response:
     """Проверяет работоспособность сервиса.
 
     Возвращает статус сервиса и временную метку для мониторинга.
+    Тело ответа пересобирается не чаще раза в секунду, поэтому частые
+    проверки балансировщика не форматируют время на каждый запрос.
 
     Returns:
-        dict: Статус сервиса и временная метка.
+        Response: Статус сервиса и временная метка в JSON.
     """
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    global _health_body, _health_expires_at
+
+    now = time.monotonic()
+    if now >= _health_expires_at:
+        _health_body = orjson.dumps(
+            {"status": "healthy", "timestamp": datetime.now().isoformat()}
+        )
+        _health_expires_at = now + 1
+
+    return Response(content=_health_body, media_type="application/json")
 
 
 @app.get("/stats/{user_id}")
@@ -287,27 +445,19 @@ async def get_user_stats(user_id: int) -> dict:
     Returns:
         dict: Статистика использования для пользователя.
     """
-    user_stat = user_stats.get(
-        user_id,
-        {
-            "total": 0,
-            "positive": 0,
-            "negative": 0,
-            "neutral": 0,
-            "start_time": datetime.now().isoformat(),
-        },
-    )
+    user_stat = user_stats.get(user_id) or UserStat()
 
     # Вычисляем uptime
-    start_time = datetime.fromisoformat(user_stat["start_time"])
-    uptime = datetime.now() - start_time
+    uptime_seconds = time.time() - user_stat.start_time
+
+    positive, negative, neutral = user_stat.counts
 
     return {
-        "total_requests": user_stat["total"],
-        "positive": user_stat["positive"],
-        "negative": user_stat["negative"],
-        "neutral": user_stat["neutral"],
-        "uptime_seconds": uptime.total_seconds(),
+        "total_requests": user_stat.total,
+        "positive": positive,
+        "negative": negative,
+        "neutral": neutral,
+        "uptime_seconds": uptime_seconds,
     }
 
 
@@ -325,7 +475,7 @@ async def handle_exceptions(request, exc):
     Returns:
         JSONResponse: Стандартный ответ об ошибке.
     """
-    logger.error(f"Необработанная ошибка: {exc}")
+    logger.error("Необработанная ошибка: %s", exc)
 
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
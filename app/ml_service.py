@@ -6,19 +6,37 @@
 в себя поддержку определения иронии и кэширования результатов.
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Literal, List
+from typing import Callable, Literal, List
+import asyncio
+import functools
 import logging
 import hashlib
+import os
+import re
 import threading
 
-from transformers import pipeline
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoTokenizer, pipeline
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
 
 logger = logging.getLogger(__name__)
-from core.config import get_ml_model
+from core.config import (
+    get_ml_model,
+    get_ml_num_threads,
+    get_ml_onnx_path,
+    get_ml_quantize,
+    get_ml_torch_compile,
+)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SentimentResult:
     text: str
     sentiment: Literal["positive", "negative", "neutral"]
@@ -37,6 +55,270 @@ class SentimentResult:
         }
 
 
+def _cpu_thread_count() -> int:
+    """Вычисляет число потоков инференса на один процесс.
+
+    Если задан ML_NUM_THREADS, используется он. Иначе берётся число
+    физических ядер, поделённое между воркерами uvicorn (WEB_CONCURRENCY),
+    чтобы процессы не конкурировали за одни и те же ядра. Физических ядер
+    считается вдвое меньше логических, что верно только при включённом
+    SMT/Hyper-Threading; без него число потоков лучше задать явно.
+    """
+    num_threads = get_ml_num_threads()
+    if num_threads:
+        return max(1, num_threads)
+
+    try:
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        logger.warning(
+            "Некорректное значение WEB_CONCURRENCY=%r, используется 1",
+            os.getenv("WEB_CONCURRENCY"),
+        )
+        workers = 1
+    return max(1, (os.cpu_count() or 2) // 2 // workers)
+
+
+class _OnnxClassifier:
+    """Классификатор тональности на ONNX Runtime.
+
+    Повторяет интерфейс пайплайна transformers: принимает строку или список
+    строк и возвращает список словарей с ключами label и score. Ожидает
+    каталог, экспортированный командой
+    ``optimum-cli export onnx --model <model> --task text-classification <dir>``.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False):
+        """Загружает модель, токенизатор и метки классов.
+
+        Args:
+            model_dir (str): Каталог с model.onnx, токенизатором и config.json.
+            quantize (bool): Использовать int8-версию модели.
+        """
+        model_path = os.path.join(model_dir, "model.onnx")
+        if quantize:
+            model_path = self._quantize(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = _cpu_thread_count()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.id2label = AutoConfig.from_pretrained(model_dir).id2label
+        self._input_names = {
+            model_input.name for model_input in self.session.get_inputs()
+        }
+
+    @staticmethod
+    def _quantize(model_path: str) -> str:
+        """Создаёт int8-версию модели рядом с исходной.
+
+        Квантизованная модель сохраняется на диск и переиспользуется при
+        следующих запусках. Если квантизация не удалась, возвращается путь
+        к исходной FP32-модели.
+
+        Args:
+            model_path (str): Путь к FP32-модели.
+
+        Returns:
+            str: Путь к модели, которую нужно загрузить.
+        """
+        root, ext = os.path.splitext(model_path)
+        quantized_path = f"{root}.int8{ext}"
+        if os.path.exists(quantized_path):
+            return quantized_path
+
+        try:
+            # Квантизации нужен отдельный пакет onnx, поэтому импорт ленивый
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            logger.warning(
+                "Квантизация ONNX требует пакет onnx, используется FP32: %s", e
+            )
+            return model_path
+
+        try:
+            quantize_dynamic(
+                model_path,
+                quantized_path,
+                weight_type=QuantType.QInt8,
+                op_types_to_quantize=["MatMul", "Gemm"],
+            )
+            logger.info("ONNX-модель квантизована в int8: %s", quantized_path)
+            return quantized_path
+        except Exception as e:
+            logger.warning("Квантизация ONNX недоступна, используется FP32: %s", e)
+            return model_path
+
+    def __call__(
+        self, texts: str | List[str], batch_size: int | None = None
+    ) -> List[dict]:
+        """Классифицирует тексты.
+
+        Args:
+            texts (str | List[str]): Текст или список текстов.
+            batch_size (int, optional): Размер батча. По умолчанию все тексты
+                обрабатываются одним батчем.
+
+        Returns:
+            List[dict]: Предсказания с ключами label и score.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        step = batch_size or len(texts)
+
+        predictions = []
+        for start in range(0, len(texts), step):
+            inputs = self.tokenizer(
+                texts[start : start + step],
+                padding=True,
+                truncation=True,
+                max_length=512,
+                return_tensors="np",
+            )
+            feed = {
+                name: value
+                for name, value in inputs.items()
+                if name in self._input_names
+            }
+            logits = self.session.run(None, feed)[0]
+
+            # Softmax по классам
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probabilities = exp / exp.sum(axis=1, keepdims=True)
+
+            for row in probabilities:
+                label_id = int(row.argmax())
+                predictions.append(
+                    {"label": self.id2label[label_id], "score": float(row[label_id])}
+                )
+
+        return predictions
+
+
+class _TinyLFUCache:
+    """Кэш результатов анализа с политикой вытеснения W-TinyLFU.
+
+    Новые записи попадают в небольшое LRU-окно, а вытесненный из окна
+    кандидат допускается в основной SLRU-кэш, только если встречался
+    чаще, чем его жертва. Частоты оцениваются Count-Min Sketch и
+    периодически делятся пополам, поэтому поток разовых текстов не
+    вытесняет часто запрашиваемые. Не потокобезопасен: синхронизацию
+    обеспечивает вызывающий код.
+    """
+
+    _SKETCH_DEPTH = 4
+    _SKETCH_WIDTH = 2048  # Должна быть степенью двойки
+    _SKETCH_MAX = 15  # Счётчики 4-битные, как в оригинальном TinyLFU
+
+    def __init__(self, capacity: int):
+        """Инициализирует кэш.
+
+        Args:
+            capacity (int): Максимальное количество записей.
+        """
+        self.capacity = capacity
+        self._window_capacity = max(1, capacity // 100)
+        self._main_capacity = capacity - self._window_capacity
+        self._protected_capacity = self._main_capacity * 4 // 5
+
+        self._window: OrderedDict = OrderedDict()
+        self._probation: OrderedDict = OrderedDict()
+        self._protected: OrderedDict = OrderedDict()
+
+        self._sketch = [[0] * self._SKETCH_WIDTH for _ in range(self._SKETCH_DEPTH)]
+        self._additions = 0
+        self._reset_threshold = 10 * capacity
+
+    def __len__(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def _indexes(self, key) -> List[int]:
+        """Вычисляет позиции ключа в строках скетча по разным битам хэша."""
+        h = hash(key)
+        mask = self._SKETCH_WIDTH - 1
+        return [(h >> (row * 11)) & mask for row in range(self._SKETCH_DEPTH)]
+
+    def _record(self, key) -> None:
+        """Учитывает обращение к ключу в скетче частот."""
+        for row, index in zip(self._sketch, self._indexes(key)):
+            if row[index] < self._SKETCH_MAX:
+                row[index] += 1
+
+        self._additions += 1
+        if self._additions >= self._reset_threshold:
+            # Старение: старые обращения постепенно теряют вес
+            for row in self._sketch:
+                row[:] = [count >> 1 for count in row]
+            self._additions //= 2
+
+    def _frequency(self, key) -> int:
+        """Оценивает частоту обращений к ключу."""
+        return min(row[index] for row, index in zip(self._sketch, self._indexes(key)))
+
+    def get(self, key):
+        """Возвращает значение по ключу или None и учитывает обращение."""
+        self._record(key)
+
+        if key in self._window:
+            self._window.move_to_end(key)
+            return self._window[key]
+
+        if key in self._protected:
+            self._protected.move_to_end(key)
+            return self._protected[key]
+
+        if key in self._probation:
+            # Повторное попадание переводит запись в защищённый сегмент
+            value = self._probation.pop(key)
+            self._protected[key] = value
+            if len(self._protected) > self._protected_capacity:
+                demoted_key, demoted = self._protected.popitem(last=False)
+                self._probation[demoted_key] = demoted
+            return value
+
+        return None
+
+    def peek(self, key):
+        """Возвращает значение по ключу или None, не учитывая обращение."""
+        for segment in (self._window, self._protected, self._probation):
+            if key in segment:
+                return segment[key]
+        return None
+
+    def put(self, key, value) -> None:
+        """Сохраняет значение, вытесняя запись по политике W-TinyLFU."""
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                segment[key] = value
+                return
+
+        self._window[key] = value
+        if len(self._window) <= self._window_capacity:
+            return
+
+        candidate_key, candidate = self._window.popitem(last=False)
+        if len(self._probation) + len(self._protected) < self._main_capacity:
+            self._probation[candidate_key] = candidate
+            return
+
+        # Основной кэш заполнен: кандидат заменяет жертву, только если он популярнее
+        victim_key = next(iter(self._probation), None)
+        if victim_key is None:
+            return
+
+        if self._frequency(candidate_key) > self._frequency(victim_key):
+            del self._probation[victim_key]
+            self._probation[candidate_key] = candidate
+
+
 class SentimentAnalyzer:
     """Анализатор тональности текста с поддержкой определения иронии.
 
@@ -45,11 +327,18 @@ class SentimentAnalyzer:
     и кэширования результатов анализа.
     """
 
-    # модель возвращает: POSITIVE, NEGATIVE, NEUTRAL
+    # Модели возвращают метки в разном регистре или в виде LABEL_<id>;
+    # все варианты перечислены явно, чтобы не приводить метку к регистру
     _LABEL_MAP = {
         "POSITIVE": "positive",
         "NEGATIVE": "negative",
         "NEUTRAL": "neutral",
+        "positive": "positive",
+        "negative": "negative",
+        "neutral": "neutral",
+        "LABEL_0": "negative",
+        "LABEL_1": "neutral",
+        "LABEL_2": "positive",
     }
 
     # Ключевые фразы для детекции иронии
@@ -66,9 +355,24 @@ class SentimentAnalyzer:
         "ну ты и молодец",
         "спасибо, конечно",
         "ну да, ну да",
-        "",
     }
 
+    # Размер батча одного прохода модели; тексты внутри батча паддятся
+    # до самого длинного, поэтому батчи собираются из текстов близкой длины
+    _MODEL_BATCH_SIZE = 16
+
+    # Текст без слов (цифры, пунктуация, пробелы): модель на нём не вызывается
+    _NO_WORDS_RE = re.compile(r"[\s\d.,!?;:()\[\]{}\"'«»…\-–—/\\*+=%#&@_~`^<>|]*")
+
+    # Предложение: текст до знака конца предложения включительно или остаток
+    _SENTENCE_RE = re.compile(r"[^.!?]*[.!?]|[^.!?]+")
+
+    # Все фразы в одном регулярном выражении: текст сканируется за один проход
+    _IRONY_RE = re.compile(
+        "|".join(re.escape(phrase) for phrase in _IRONY_PHRASES if phrase),
+        re.IGNORECASE,
+    )
+
     def __init__(self, model_name: str | None = None):
         """Инициализирует анализатор тональности.
 
@@ -85,9 +389,17 @@ class SentimentAnalyzer:
         logger.info(f"Загрузка модели: {self.model_name}")
 
         # Инициализация кэша
-        self._cache = {}
+        self._cache = _TinyLFUCache(capacity=1000)
         self._cache_lock = threading.Lock()
 
+        # Конкурентные запросы объединяются в батчи для одного вызова модели
+        # Промах уже учтён в analyze_async, повторно в скетч он не пишется
+        self._batcher = MicroBatcher(
+            functools.partial(self.analyze_batch, record_access=False)
+        )
+        # Запросы, которые уже анализируются: ключ кэша -> задача анализа
+        self._in_flight: dict[bytes, asyncio.Task] = {}
+
     def _init_model(self) -> None:
         """Ленивая инициализация пайплайна модели."""
         if self.classifier is not None:
@@ -95,19 +407,95 @@ class SentimentAnalyzer:
 
         try:
             logger.info(f"Загрузка модели: {self.model_name}")
+            onnx_path = get_ml_onnx_path()
+            if onnx_path and ort is not None:
+                # ONNX Runtime с оптимизацией графа быстрее PyTorch на CPU
+                self.classifier = _OnnxClassifier(onnx_path, get_ml_quantize())
+                logger.info(f"Модель {self.model_name} загружена из ONNX: {onnx_path}")
+                return
+            if onnx_path:
+                logger.warning("onnxruntime не установлен, используется PyTorch")
+
+            use_cuda = torch.cuda.is_available()
+            if use_cuda:
+                # TF32 ускоряет матричные умножения на Ampere и новее
+                torch.backends.cuda.matmul.allow_tf32 = True
+
             # Используем упрощённую инициализацию
             self.classifier = pipeline(
                 task="sentiment-analysis",
                 model=self.model_name,
-                device=-1,  # CPU
+                device=0 if use_cuda else -1,  # GPU, если доступен, иначе CPU
+                dtype=torch.float16 if use_cuda else torch.float32,
                 truncation=True,
                 max_length=512,
             )
+            if not use_cuda:
+                self._configure_cpu_threads()
+                # Динамическая квантизация поддерживается только на CPU
+                if get_ml_quantize():
+                    self._quantize_model()
+            if get_ml_torch_compile():
+                self._compile_model()
             logger.info(f"Модель {self.model_name} загружена")
         except Exception as e:
             logger.error(f" Критическая ошибка загрузки модели: {e}")
             raise RuntimeError(f"Не удалось загрузить модель {self.model_name}") from e
 
+    def _configure_cpu_threads(self) -> None:
+        """Настраивает число потоков torch под физические ядра.
+
+        Лишние потоки конкурируют за ядра и увеличивают хвостовые задержки,
+        поэтому используется _cpu_thread_count.
+        """
+        torch.set_num_threads(_cpu_thread_count())
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Число inter-op потоков можно задать только до первого параллельного вызова
+            pass
+
+    def _compile_model(self) -> None:
+        """Компилирует модель через torch.compile.
+
+        Компиляция сливает операции графа в оптимизированные ядра; форма
+        входа динамическая, так как длина батчей меняется от запроса к
+        запросу. Компиляция ленивая, поэтому сразу выполняется пробный
+        прогон: если он падает, возвращается исходная eager-модель.
+        """
+        eager_model = self.classifier.model
+        try:
+            self.classifier.model = torch.compile(eager_model, dynamic=True)
+            self.classifier("warmup")
+            logger.info("Модель скомпилирована через torch.compile")
+        except Exception as e:
+            self.classifier.model = eager_model
+            logger.warning("torch.compile недоступен, используется eager-режим: %s", e)
+
+    def warmup(self) -> None:
+        """Загружает модель и выполняет пробный прогон.
+
+        Вызывается при запуске приложения, чтобы первый запрос не ждал
+        загрузки весов и инициализации вычислительных ядер.
+        """
+        self._init_model()
+        self.classifier("warmup")
+
+    def _quantize_model(self) -> None:
+        """Квантизует линейные слои модели в int8.
+
+        Динамическая квантизация ускоряет инференс на CPU в несколько раз
+        при незначительной потере точности. Если бэкенд квантизации
+        недоступен на платформе, модель остаётся в FP32.
+        """
+        try:
+            self.classifier.model = torch.ao.quantization.quantize_dynamic(
+                self.classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Модель квантизована в int8")
+        except Exception as e:
+            logger.warning("Квантизация недоступна, используется FP32: %s", e)
+
     def analyze(self, text: str) -> dict[str, object]:
         """Анализирует тональность текста.
 
@@ -130,7 +518,7 @@ class SentimentAnalyzer:
             ValueError: Если текст пустой или состоит только из пробелов.
             RuntimeError: Если произошла ошибка во время анализа модели.
         """
-        if not text or not text.strip():
+        if not text or text.isspace():
             raise ValueError("Текст не может быть пустым")
 
         # Проверяем кэш
@@ -145,8 +533,7 @@ class SentimentAnalyzer:
 
         try:
             # Анализ моделью
-            result = self._analyze_with_model(text, irony_detected)
-            result_dict = result.as_dict()
+            result_dict = self._analyze_with_model_dict(text, irony_detected)
 
             # Сохраняем в кэш
             self._save_to_cache(cache_key, result_dict)
@@ -156,33 +543,106 @@ class SentimentAnalyzer:
             logger.error(f"Ошибка анализа: {e}")
             raise RuntimeError("Ошибка анализа тональности") from e
 
-    def _analyze_with_model(self, text: str, irony_detected: bool) -> SentimentResult:
+    async def analyze_async(self, text: str) -> dict[str, object]:
+        """Анализирует текст в общем батче с конкурентными запросами.
+
+        Результат из кэша возвращается без постановки в очередь. Если тот же
+        текст уже анализируется, запрос ждёт готовый результат вместо
+        повторного прогона модели.
+
+        Args:
+            text (str): Текст для анализа тональности.
+
+        Returns:
+            dict[str, object]: Результат в том же формате, что и у analyze.
+
+        Raises:
+            ValueError: Если текст пустой или состоит только из пробелов.
+            RuntimeError: Если произошла ошибка во время анализа модели.
+        """
+        cache_key = self._get_cache_key(text)
+        cached_result = self._get_from_cache(cache_key)
+        if cached_result:
+            return cached_result
+
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._batcher.submit(text))
+            self._in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+
+        # Отмена одного ожидающего не должна отменять анализ для остальных
+        return await asyncio.shield(task)
+
+    def start_batching(self) -> None:
+        """Запускает фоновую обработку батчей в текущем цикле событий."""
+        self._batcher.start()
+
+    async def stop_batching(self) -> None:
+        """Останавливает фоновую обработку батчей."""
+        await self._batcher.stop()
+
+    def _analyze_with_model_dict(
+        self, text: str, irony_detected: bool
+    ) -> dict[str, object]:
         """Основной анализ текста с помощью модели.
 
         Выполняет анализ тональности текста с использованием предобученной
         модели. Для длинных текстов (>2000 символов) использует специальный
-        метод анализа частями.
+        метод анализа частями. Результат сразу собирается в словарь, без
+        промежуточного SentimentResult.
 
         Args:
             text (str): Текст для анализа.
             irony_detected (bool): Флаг обнаруженной иронии.
 
         Returns:
-            SentimentResult: Результат анализа тональности.
+            dict[str, object]: Результат в формате SentimentResult.as_dict.
         """
         # Ленивая инициализация модели
         self._init_model()
 
         # Для очень длинных текстов разбиваем на части
         if len(text) > 2000:
-            return self._analyze_long_text(text, irony_detected)
+            return self._analyze_long_text(text, irony_detected).as_dict()
+
+        # Тексту без слов модель не может приписать тональность
+        if self._NO_WORDS_RE.fullmatch(text):
+            return self._neutral_result(text, irony_detected).as_dict()
 
         # Получаем предсказание
         prediction = self.classifier(text)[0]
 
+        return self._prediction_to_dict(text, prediction, irony_detected)
+
+    def _neutral_result(self, text: str, irony_detected: bool) -> SentimentResult:
+        """Возвращает нейтральный результат с уверенностью 0.5.
+
+        Используется, когда модель не вызывалась или не дала предсказаний.
+        """
+        return SentimentResult(
+            text=text,
+            sentiment="neutral",
+            confidence=0.5,
+            irony_detected=irony_detected,
+            model_used=self.model_name,
+        )
+
+    def _prediction_to_dict(
+        self, text: str, prediction: dict, irony_detected: bool
+    ) -> dict[str, object]:
+        """Преобразует предсказание модели в результат анализа.
+
+        Args:
+            text (str): Исходный текст.
+            prediction (dict): Предсказание пайплайна с ключами label и score.
+            irony_detected (bool): Флаг обнаруженной иронии.
+
+        Returns:
+            dict[str, object]: Результат в формате SentimentResult.as_dict.
+        """
         # Нормализуем метку
-        raw_label = prediction["label"].upper()
-        sentiment = self._LABEL_MAP.get(raw_label, "neutral")
+        sentiment = self._LABEL_MAP.get(prediction["label"], "neutral")
         confidence = float(prediction["score"])
 
         # Корректируем для иронии
@@ -190,13 +650,100 @@ class SentimentAnalyzer:
             sentiment = "negative"
             confidence = max(0.1, confidence * 0.5)  # Сильно снижаем уверенность
 
-        return SentimentResult(
-            text=text,
-            sentiment=sentiment,
-            confidence=confidence,
-            irony_detected=irony_detected,
-            model_used=self.model_name,
-        )
+        return {
+            "text": text,
+            "sentiment": sentiment,
+            "confidence": confidence,
+            "irony_detected": irony_detected,
+            "model_used": self.model_name,
+        }
+
+    def analyze_batch(
+        self, texts: List[str], *, record_access: bool = True
+    ) -> List[dict[str, object]]:
+        """Анализирует тональность нескольких текстов одним вызовом модели.
+
+        Результаты из кэша возвращаются сразу, остальные короткие тексты
+        классифицируются одним батчем, что заметно дешевле последовательных
+        вызовов пайплайна. Длинные тексты анализируются по частям, как в analyze.
+
+        Args:
+            texts (List[str]): Непустые тексты для анализа.
+            record_access (bool): Учитывать ли обращения к кэшу в частотах
+                TinyLFU. False, если промах уже учтён вызывающим кодом.
+
+        Returns:
+            List[dict[str, object]]: Результаты в порядке входных текстов,
+                в том же формате, что и у analyze.
+
+        Raises:
+            ValueError: Если один из текстов пустой.
+            RuntimeError: Если произошла ошибка во время анализа модели.
+        """
+        if any(not text or text.isspace() for text in texts):
+            raise ValueError("Текст не может быть пустым")
+
+        results: List[dict[str, object] | None] = [None] * len(texts)
+        pending = []  # (индекс, текст, ключ кэша, ирония)
+        pending_index: dict[bytes, int] = {}  # ключ кэша -> индекс в results
+        duplicates = []  # (индекс повтора, индекс первого вхождения)
+
+        for index, text in enumerate(texts):
+            cache_key = self._get_cache_key(text)
+
+            # Одинаковые тексты в батче анализируются один раз
+            if cache_key in pending_index:
+                duplicates.append((index, pending_index[cache_key]))
+                continue
+
+            cached_result = self._get_from_cache(cache_key, record_access)
+            if cached_result:
+                results[index] = cached_result
+            elif self._NO_WORDS_RE.fullmatch(text):
+                results[index] = self._neutral_result(text, False).as_dict()
+            else:
+                pending_index[cache_key] = index
+                pending.append((index, text, cache_key, self._detect_irony(text)))
+
+        if pending:
+            try:
+                self._init_model()
+
+                # Тексты сортируются по длине, чтобы в каждый батч модели попадали
+                # тексты близкой длины и на паддинг уходило меньше вычислений
+                short = sorted(
+                    (item for item in pending if len(item[1]) <= 2000),
+                    key=lambda item: len(item[1]),
+                )
+                predictions = (
+                    self.classifier(
+                        [text for _, text, _, _ in short],
+                        batch_size=min(len(short), self._MODEL_BATCH_SIZE),
+                    )
+                    if short
+                    else []
+                )
+
+                for (index, text, cache_key, irony_detected), prediction in zip(
+                    short, predictions
+                ):
+                    result = self._prediction_to_dict(text, prediction, irony_detected)
+                    self._save_to_cache(cache_key, result)
+                    results[index] = result
+
+                for index, text, cache_key, irony_detected in pending:
+                    if results[index] is None:
+                        result = self._analyze_long_text(text, irony_detected).as_dict()
+                        self._save_to_cache(cache_key, result)
+                        results[index] = result
+            except Exception as e:
+                logger.error("Ошибка пакетного анализа: %s", e)
+                raise RuntimeError("Ошибка анализа тональности") from e
+
+        for index, first_index in duplicates:
+            results[index] = results[first_index]
+
+        return results
 
     def _analyze_long_text(self, text: str, irony_detected: bool) -> SentimentResult:
         """Анализ длинных текстов путем разбиения на части.
@@ -211,39 +758,40 @@ class SentimentAnalyzer:
         Returns:
             SentimentResult: Агрегированный результат анализа.
         """
-        # Разбиваем текст на части по предложениям
-        sentences = self._split_sentences(text)
-
-        # Анализируем каждую часть
-        results = []
-        for sentence in sentences:
-            if len(sentence.strip()) > 0:
-                try:
-                    prediction = self.classifier(sentence[:1000])[0]
-                    results.append(
-                        {"label": prediction["label"], "score": prediction["score"]}
-                    )
-                except Exception as e:
-                    logger.warning(f"Ошибка анализа части текста: {e}")
-                    continue
-
-        if not results:
-            return SentimentResult(
-                text=text,
-                sentiment="neutral",
-                confidence=0.5,
-                irony_detected=irony_detected,
-                model_used=self.model_name,
+        # Разбиваем текст на части по предложениям; порядок для агрегации
+        # не важен, поэтому части сортируются по длине для меньшего паддинга
+        sentences = sorted(
+            (sentence[:1000] for sentence in self._split_sentences(text)), key=len
+        )
+
+        # Анализируем все части одним батчевым вызовом модели
+        try:
+            predictions = (
+                self.classifier(
+                    sentences, batch_size=min(len(sentences), self._MODEL_BATCH_SIZE)
+                )
+                if sentences
+                else []
             )
+        except Exception as e:
+            logger.warning("Ошибка анализа частей текста: %s", e)
+            predictions = []
 
-        # Агрегируем результаты
-        total_score = sum(r["score"] for r in results)
-        avg_confidence = total_score / len(results)
+        if not predictions:
+            return self._neutral_result(text, irony_detected)
+
+        # Агрегируем результаты за один проход
+        counts = {"positive": 0, "negative": 0, "neutral": 0}
+        total_score = 0.0
+        for prediction in predictions:
+            counts[self._LABEL_MAP.get(prediction["label"], "neutral")] += 1
+            total_score += prediction["score"]
+        avg_confidence = total_score / len(predictions)
 
         # Определяем доминирующую тональность
-        positive_count = sum(1 for r in results if "POSITIVE" in r["label"].upper())
-        negative_count = sum(1 for r in results if "NEGATIVE" in r["label"].upper())
-        neutral_count = len(results) - positive_count - negative_count
+        positive_count = counts["positive"]
+        negative_count = counts["negative"]
+        neutral_count = counts["neutral"]
 
         if positive_count > negative_count and positive_count > neutral_count:
             sentiment = "positive"
@@ -273,53 +821,162 @@ class SentimentAnalyzer:
             List[str]: Список предложений.
         """
         # Разбиваем по точкам, восклицательным и вопросительным знакам
-        sentences = []
-        current_sentence = ""
-
-        for char in text:
-            current_sentence += char
-            if char in ".!?":
-                sentences.append(current_sentence.strip())
-                current_sentence = ""
-
-        # Добавляем остаток
-        if current_sentence.strip():
-            sentences.append(current_sentence.strip())
-
-        return sentences
+        sentences = (match.strip() for match in self._SENTENCE_RE.findall(text))
+        return [sentence for sentence in sentences if sentence]
 
     def _detect_irony(self, text: str) -> bool:
         """Обнаруживает иронию в тексте."""
-        text_lower = text.lower()
-        return any(phrase in text_lower for phrase in self._IRONY_PHRASES)
+        return self._IRONY_RE.search(text) is not None
 
-    def _get_cache_key(self, text: str) -> str:
+    def _get_cache_key(self, text: str) -> bytes:
         """Генерирует ключ для кэширования.
 
-        Использует MD5 хэш от текста для создания уникального ключа.
+        Использует 16-байтный дайджест BLAKE2b от текста: он быстрее MD5,
+        а байтовый ключ не требует hex-кодирования.
 
         Args:
             text (str): Текст для генерации ключа.
 
         Returns:
-            str: Уникальный ключ для кэширования.
+            bytes: Уникальный ключ для кэширования.
         """
-        return hashlib.md5(text.encode("utf-8")).hexdigest()
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _get_from_cache(self, cache_key: bytes, record: bool = True) -> dict | None:
+        """Получает результат из кэша по ключу.
 
-    def _get_from_cache(self, cache_key: str) -> dict | None:
-        """Получает результат из кэша по ключу."""
+        При record=False обращение не учитывается в частотах TinyLFU.
+        """
         with self._cache_lock:
-            return self._cache.get(cache_key)
+            if record:
+                return self._cache.get(cache_key)
+            return self._cache.peek(cache_key)
 
-    def _save_to_cache(self, cache_key: str, result: dict) -> None:
+    def _save_to_cache(self, cache_key: bytes, result: dict) -> None:
         """Сохраняет результат в кэш."""
         with self._cache_lock:
-            # Ограничиваем размер кэша
-            if len(self._cache) >= 1000:
-                # Удаляем самый старый элемент
-                oldest_key = next(iter(self._cache))
-                del self._cache[oldest_key]
-            self._cache[cache_key] = result
+            self._cache.put(cache_key, result)
+
+
+class MicroBatcher:
+    """Собирает конкурентные запросы на анализ в небольшие батчи.
+
+    Запросы складываются в очередь; фоновая задача забирает до
+    max_batch_size текстов, ожидая новые не дольше max_wait_ms после
+    первого, и анализирует их одним вызовом analyze_batch в отдельном
+    потоке, не блокируя цикл событий.
+    """
+
+    def __init__(
+        self,
+        analyze_batch: Callable[[List[str]], List[dict[str, object]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+    ):
+        """Инициализирует батчер.
+
+        Args:
+            analyze_batch (Callable): Функция пакетного анализа, например
+                SentimentAnalyzer.analyze_batch.
+            max_batch_size (int): Максимальный размер батча.
+            max_wait_ms (float): Сколько ждать пополнения батча, мс.
+        """
+        self._analyze_batch = analyze_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        """Запускает фоновую задачу в текущем цикле событий."""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и отменяет ожидающие запросы."""
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    def stop_threadsafe(self) -> None:
+        """Планирует stop() в цикле событий батчера из любого потока."""
+        if self._worker is None or self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop)
+
+    async def submit(self, text: str) -> dict[str, object]:
+        """Ставит текст в очередь и ждёт результат анализа.
+
+        Args:
+            text (str): Текст для анализа тональности.
+
+        Returns:
+            dict[str, object]: Результат в формате SentimentAnalyzer.analyze.
+
+        Raises:
+            ValueError: Если текст пустой или состоит только из пробелов.
+            RuntimeError: Если произошла ошибка во время анализа модели.
+        """
+        if not text or text.isspace():
+            raise ValueError("Текст не может быть пустым")
+
+        # Запускаем обработчик, если приложение стартовало без lifespan
+        self.start()
+
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Основной цикл: собирает батч и отдаёт его анализатору."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                texts = [text for text, _ in batch]
+                results = await asyncio.to_thread(self._analyze_batch, texts)
+            except asyncio.CancelledError:
+                # Батч уже извлечён из очереди, и stop() его не увидит
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
 
 
 _analyzer: SentimentAnalyzer | None = None
@@ -344,7 +1001,8 @@ def set_analyzer(model_name: str) -> SentimentAnalyzer:
     """Устанавливает новую модель анализатора.
 
     Создает новый экземпляр анализатора с указанной моделью
-    и заменяет текущий singleton экземпляр.
+    и заменяет текущий singleton экземпляр. Батчер прежнего
+    анализатора останавливается в своём цикле событий.
 
     Args:
         model_name (str): Название новой модели для анализа тональности.
@@ -353,7 +1011,10 @@ def set_analyzer(model_name: str) -> SentimentAnalyzer:
         SentimentAnalyzer: Новый экземпляр анализатора.
     """
     global _analyzer
+    previous = _analyzer
     _analyzer = SentimentAnalyzer(model_name)
+    if previous is not None:
+        previous._batcher.stop_threadsafe()
     return _analyzer
 
 
@@ -369,5 +1030,6 @@ async def analyze_async_result(text: str) -> SentimentResult:
     Returns:
         SentimentResult: Результат анализа тональности.
     """
-    analyzer = get_analyzer()
-    return analyzer._analyze_with_model(text, analyzer._detect_irony(text))
+    # Запрос проходит через кэш и общий батч, не блокируя цикл событий
+    result = await get_analyzer().analyze_async(text)
+    return SentimentResult(**result)
@@ -1,15 +1,17 @@
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import json
 import os
 import sys
+import threading
 
 # Добавляем путь к приложению
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from main import app
 from ml_service import SentimentAnalyzer, get_analyzer
-from bot.services import analyze_text, fetch_stats, get_user_history
+from bot.services import analyze_text, close_session, fetch_user_stats, get_user_history
 
 client = TestClient(app)
 
@@ -83,6 +85,29 @@ def test_stats_endpoint():
     print(f"✅ Статистика: {data['total_requests']} запросов")
 
 
+def test_user_stat_from_dict_iso_time():
+    """Тест загрузки статистики старого формата с ISO-временем"""
+    from datetime import datetime
+    from main import UserStat
+
+    user_stat = UserStat.from_dict(
+        {
+            "total": 3,
+            "positive": 2,
+            "neutral": 1,
+            "start_time": "2024-01-15T10:30:00",
+        }
+    )
+    assert user_stat.total == 3
+    assert user_stat.counts == [2, 0, 1]
+    assert user_stat.start_time == datetime(2024, 1, 15, 10, 30).timestamp()
+
+    # Новый формат хранит время числом и читается без преобразования
+    restored = UserStat.from_dict(user_stat.as_dict())
+    assert restored == user_stat
+    print("✅ Статистика: ISO-время конвертируется в timestamp")
+
+
 def test_predict_negative_text():
     """Тест негативного текста"""
     response = client.post(
@@ -138,6 +163,168 @@ def test_ml_service_irony_detection():
     print("✅ ML сервис: ирония")
 
 
+def test_ml_cache_scan_resistance():
+    """Тест устойчивости кэша анализатора к потоку разовых текстов"""
+    from ml_service import _TinyLFUCache
+
+    cache = _TinyLFUCache(capacity=100)
+    hot_keys = [f"hot-{i}" for i in range(50)]
+
+    # Прогреваем популярные ключи
+    for _ in range(3):
+        for key in hot_keys:
+            if cache.get(key) is None:
+                cache.put(key, key)
+
+    # Поток разовых текстов не должен вытеснить популярные
+    for i in range(1000):
+        key = f"scan-{i}"
+        if cache.get(key) is None:
+            cache.put(key, key)
+
+    assert len(cache) <= 100
+    assert all(cache.get(key) == key for key in hot_keys)
+    print("✅ Кэш анализатора устойчив к сканированию")
+
+
+def test_micro_batcher_stop_cancels_running_batch():
+    """Тест остановки батчера во время анализа батча"""
+    from ml_service import MicroBatcher
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_batch(texts):
+        started.set()
+        release.wait(5)
+        return [{"text": text} for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(slow_batch, max_wait_ms=1)
+        task = asyncio.create_task(batcher.submit("Тестовый текст"))
+        await asyncio.to_thread(started.wait, 5)
+
+        # Батч уже в работе: stop() не должен оставить вызывающего висеть
+        await asyncio.wait_for(batcher.stop(), 1)
+        await asyncio.wait([task], timeout=1)
+        release.set()
+        return task.cancelled()
+
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        release.set()
+    print("✅ Остановка батчера отменяет запросы текущего батча")
+
+
+def test_micro_batcher_groups_requests():
+    """Тест объединения конкурентных запросов в один батч"""
+    from ml_service import MicroBatcher
+
+    calls = []
+
+    def fake_batch(texts):
+        calls.append(list(texts))
+        if "ошибка" in texts:
+            raise RuntimeError("Ошибка модели")
+        return [{"text": text} for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(fake_batch, max_batch_size=4, max_wait_ms=50)
+        texts = [f"Текст {i}" for i in range(6)]
+        results = await asyncio.gather(*(batcher.submit(text) for text in texts))
+        assert [result["text"] for result in results] == texts
+
+        # Ошибка анализа передаётся каждому запросу батча
+        errors = await asyncio.gather(
+            batcher.submit("ошибка"), batcher.submit("текст"), return_exceptions=True
+        )
+        await batcher.stop()
+        return errors
+
+    errors = asyncio.run(scenario())
+    assert [len(batch) for batch in calls[:2]] == [4, 2]
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    print("✅ Батчер объединяет конкурентные запросы")
+
+
+def test_ml_compile_fallback():
+    """Тест возврата к eager-модели, если скомпилированная модель падает"""
+    analyzer = SentimentAnalyzer()
+    eager_model = object()
+    analyzer.classifier = MagicMock(side_effect=RuntimeError("compile failed"))
+    analyzer.classifier.model = eager_model
+
+    with patch("ml_service.torch.compile", return_value=object()):
+        analyzer._compile_model()
+
+    assert analyzer.classifier.model is eager_model
+    print("✅ Ошибка torch.compile возвращает eager-модель")
+
+
+def test_analyze_async_single_flight():
+    """Тест объединения одинаковых конкурентных запросов"""
+    analyzer = SentimentAnalyzer()
+    analyzer.classifier = MagicMock(
+        side_effect=lambda texts, **kwargs: [
+            {"label": "positive", "score": 0.9} for _ in texts
+        ]
+    )
+    text = "Отличный день сегодня!"
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(analyzer.analyze_async(text) for _ in range(5))
+        )
+        await analyzer.stop_batching()
+        return results
+
+    results = asyncio.run(scenario())
+    assert analyzer.classifier.call_count == 1
+    assert all(result == results[0] for result in results)
+    print("✅ Одинаковые запросы анализируются один раз")
+
+    # Промах учитывается в частотах кэша один раз, а не при каждой проверке
+    other_text = "Обычный текст"
+
+    async def single():
+        await analyzer.analyze_async(other_text)
+        await analyzer.stop_batching()
+
+    asyncio.run(single())
+    assert analyzer._cache._frequency(analyzer._get_cache_key(other_text)) == 1
+    print("✅ Промах учитывается в частотах кэша один раз")
+
+
+def test_set_analyzer_swaps_endpoint_analyzer():
+    """Тест замены анализатора: эндпоинты видят новую модель"""
+    import ml_service
+    from main import get_current_analyzer
+
+    previous = ml_service._analyzer
+
+    async def scenario():
+        old = ml_service.get_analyzer()
+        old.start_batching()
+        new = ml_service.set_analyzer("test-model")
+
+        # Батчер прежнего анализатора останавливается в цикле событий
+        for _ in range(100):
+            if old._batcher._worker is None:
+                break
+            await asyncio.sleep(0.01)
+        return old, new
+
+    try:
+        old, new = asyncio.run(scenario())
+        assert get_current_analyzer() is new
+        assert new.model_name == "test-model"
+        assert old._batcher._worker is None
+    finally:
+        ml_service._analyzer = previous
+    print("✅ Замена анализатора видна эндпоинтам")
+
+
 def test_bot_services():
     """Тест сервисов бота"""
     # Тест анализа текста (мокаем HTTP запросы)
@@ -155,10 +342,13 @@ def test_bot_services():
         )
         mock_post.return_value.__aenter__.return_value = mock_response
 
-        # Вызываем функцию (асинхронно)
-        import asyncio
+        async def analyze():
+            try:
+                return await analyze_text("Тестовый текст", 123)
+            finally:
+                await close_session()
 
-        result = asyncio.run(analyze_text("Тестовый текст", 123))
+        result = asyncio.run(analyze())
         assert result is not None
         assert result.sentiment == "positive"
         print("✅ Сервисы бота: анализ текста")
@@ -179,10 +369,13 @@ def test_bot_services():
         )
         mock_get.return_value.__aenter__.return_value = mock_response
 
-        # Вызываем функцию (асинхронно)
-        import asyncio
+        async def fetch():
+            try:
+                return await fetch_user_stats(123)
+            finally:
+                await close_session()
 
-        stats = asyncio.run(fetch_stats())
+        stats = asyncio.run(fetch())
         assert stats.total_requests == 100
         print("✅ Сервисы бота: статистика")
 
@@ -208,6 +401,103 @@ def test_user_history():
     print("✅ История пользователя")
 
 
+def test_result_cache_lru():
+    """Тест LRU-вытеснения в кэше результатов бота"""
+    from datetime import datetime
+    from bot import services
+
+    def make_result(text, sentiment):
+        return services.SentimentResult(text, sentiment, 0.9, datetime.now())
+
+    services.result_cache.clear()
+    with patch.object(services, "cache_limit", 2):
+        services._add_to_cache("a", make_result("a", "positive"))
+        services._add_to_cache("b", make_result("b", "negative"))
+
+        # Обращение к "a" делает её недавно использованной
+        assert services._get_from_cache("a").sentiment == "positive"
+        services._add_to_cache("c", make_result("c", "neutral"))
+
+        assert services._get_from_cache("b") is None
+        assert services._get_from_cache("a") is not None
+        assert services._get_from_cache("c") is not None
+    services.result_cache.clear()
+    print("✅ LRU-кэш результатов")
+
+
+def test_failure_cache():
+    """Тест подавления повторных запросов после ошибки API"""
+    import asyncio
+    from bot import services
+
+    services.failure_cache.clear()
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        mock_response = MagicMock()
+        mock_response.status = 500
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        async def analyze_twice():
+            first = await services.analyze_text("Текст с ошибкой", 123)
+            second = await services.analyze_text("Текст с ошибкой", 123)
+            await services.close_session()
+            return first, second
+
+        assert asyncio.run(analyze_twice()) == (None, None)
+        # Второй вызов не должен обращаться к API
+        assert mock_post.call_count == 1
+    services.failure_cache.clear()
+    print("✅ Кэш ошибок анализа")
+
+
+def test_format_stats():
+    """Тест форматирования статистики пользователя"""
+    from bot.handlers._stats_fmt import format_stats
+    from bot.services import APIStats
+
+    text = format_stats(APIStats(10, 5, 3, 1))
+    assert "Всего запросов: 10" in text
+    assert "Ошибок: 1" in text
+    assert "(50.0%)" in text
+
+    # Нулевая статистика не должна приводить к делению на ноль
+    assert "(0.0%)" in format_stats(APIStats(0, 0, 0, 0))
+    print("✅ Форматирование статистики")
+
+
+def test_handle_text_status_message():
+    """Тест обработчика текста с настоящим TelegramMethod от message.answer"""
+    from datetime import datetime
+    from aiogram import types
+    from aiogram.methods import SendMessage
+    from bot.handlers.text_analysis import handle_text
+    from bot.services import SentimentResult
+
+    status_msg = MagicMock()
+    status_msg.delete = AsyncMock()
+    bot = AsyncMock(return_value=status_msg)
+    message = types.Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=types.Chat(id=123, type="private"),
+        from_user=types.User(id=123, is_bot=False, first_name="Test"),
+        text="Отличный день сегодня!",
+    ).as_(bot)
+
+    result = SentimentResult("Отличный день сегодня!", "positive", 0.9, datetime.now())
+    with patch(
+        "bot.handlers.text_analysis.analyze_text", AsyncMock(return_value=result)
+    ):
+        asyncio.run(handle_text(message))
+
+    # Бот получает объекты SendMessage: статус и итоговый ответ
+    sent = [call.args[0] for call in bot.await_args_list]
+    assert all(isinstance(method, SendMessage) for method in sent)
+    assert sent[0].text == "🔍 Анализирую текст..."
+    assert "Результат анализа" in sent[-1].text
+    status_msg.delete.assert_awaited_once()
+    print("✅ Обработчик текста отправляет статус и результат")
+
+
 def test_rate_limiting():
     """Тест ограничения запросов"""
     # Отправляем много запросов подряд
@@ -224,12 +514,64 @@ def test_rate_limiting():
     print(f"✅ Rate limiting: {failed_requests} запросов отклонено")
 
 
+def test_rate_limit_token_bucket():
+    """Тест token bucket: отказ после всплеска, пополнение и предел числа корзин"""
+    import main
+    from fastapi import HTTPException, Request
+
+    @main.rate_limit(max_requests=5, window=60)
+    async def endpoint(body: main.SentimentRequest, request: Request):
+        return "ok"
+
+    clock = [1000.0]
+
+    async def call(ip="10.0.0.1", user_id=None):
+        request = Request({"type": "http", "client": (ip, 12345)})
+        body = main.SentimentRequest(text="Тестовый текст", userId=user_id)
+        try:
+            return await endpoint(body=body, request=request)
+        except HTTPException as e:
+            return e.status_code
+
+    async def scenario():
+        # Всплеск сверх ёмкости корзины отклоняется
+        assert [await call() for _ in range(6)] == ["ok"] * 5 + [429]
+        print("✅ Rate limiting: 429 после исчерпания всплеска")
+
+        # За window / max_requests секунд корзина пополняется на один токен
+        clock[0] += 12
+        assert await call() == "ok"
+        assert await call() == 429
+        print("✅ Rate limiting: токены пополняются со временем")
+
+        # Пользователи за одним IP (бот) получают отдельные корзины
+        codes = [await call("10.0.0.2", user_id=1) for _ in range(6)]
+        assert codes == ["ok"] * 5 + [429]
+        assert await call("10.0.0.2", user_id=2) == "ok"
+        print("✅ Rate limiting: лимит считается по user_id")
+
+        # Число отслеживаемых IP не превышает RATE_BUCKETS_LIMIT
+        for i in range(main.RATE_BUCKETS_LIMIT + 100):
+            await call(f"10.1.{i // 256}.{i % 256}")
+        assert len(main.rate_buckets) == main.RATE_BUCKETS_LIMIT
+        assert "10.0.0.1" not in main.rate_buckets
+        print("✅ Rate limiting: число корзин ограничено")
+
+    main.rate_buckets.clear()
+    try:
+        with patch("main.time.monotonic", side_effect=lambda: clock[0]):
+            asyncio.run(scenario())
+    finally:
+        main.rate_buckets.clear()
+
+
 # Запуск всех тестов
 if __name__ == "__main__":
     print("🧪 Запуск тестов API...")
     test_root_endpoint()
     test_health_endpoint()
     test_stats_endpoint()
+    test_user_stat_from_dict_iso_time()
     test_predict_endpoint()
     test_predict_negative_text()
     test_predict_neutral_text()
@@ -238,12 +580,23 @@ if __name__ == "__main__":
     print("\n🤖 Запуск тестов ML сервиса...")
     test_ml_service_analyze()
     test_ml_service_irony_detection()
+    test_ml_cache_scan_resistance()
+    test_micro_batcher_stop_cancels_running_batch()
+    test_micro_batcher_groups_requests()
+    test_ml_compile_fallback()
+    test_analyze_async_single_flight()
+    test_set_analyzer_swaps_endpoint_analyzer()
 
     print("\n💬 Запуск тестов сервисов бота...")
     test_bot_services()
     test_user_history()
+    test_result_cache_lru()
+    test_failure_cache()
+    test_format_stats()
+    test_handle_text_status_message()
 
     print("\n🛡️ Запуск тестов ограничения запросов...")
     test_rate_limiting()
+    test_rate_limit_token_bucket()
 
     print("\n🎉 Все тесты пройдены!")